@@ -1,16 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, Query, status, UploadFile, File
 from fastapi.security import HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, func, desc, or_, tuple_
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 from app.core.database import get_db
 from app.core.auth import verify_admin_credentials, create_access_token, verify_token
+from app.core.metrics import collect_metrics
 from app.models import *
 from app.services.storage import storage_service
+from app.services import rollups
+from app.services.cache import shared_cache
+from app.utils.pagination import encode_cursor, decode_cursor, parse_cursor_datetime, parse_cursor_uuid
 from pydantic import BaseModel
 
+# Admin routes run on the sync Session; they are plain `def` so FastAPI
+# executes them in its threadpool instead of blocking the event loop.
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 class AdminLogin(BaseModel):
@@ -37,23 +44,74 @@ async def admin_login(credentials: AdminLogin):
         "expires_in": 3600
     }
 
+def _user_search_filter(search: str):
+    """Prefix match on phone number or (case-insensitive) full name"""
+    if search[0].isdigit() or search[0] == "+":
+        digits = search.lstrip("+")
+        return or_(
+            UserDB.phone_number.startswith(digits, autoescape=True),
+            UserDB.phone_number.startswith(f"+{digits}", autoescape=True)
+        )
+    return func.lower(UserDB.full_name).startswith(search.lower(), autoescape=True)
+
+def _access_totals(*criteria):
+    """Per-user purchase totals, grouped over user_lesson_access"""
+    return select(
+        UserLessonAccessDB.user_id,
+        func.sum(UserLessonAccessDB.amount).label("total_spent"),
+        func.count(UserLessonAccessDB.id).label("total_lessons")
+    ).where(*criteria).group_by(UserLessonAccessDB.user_id).subquery()
+
 @router.get("/users")
-async def get_all_users(
+def get_all_users(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    sort: str = Query("joined_at", regex="^(joined_at|total_spent)$"),
+    search: Optional[str] = None,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
 ):
-    users = db.query(UserDB).all()
-    result = []
+    users = select(UserDB)
+    if search and search.strip():
+        users = users.where(_user_search_filter(search.strip()))
+    
+    if sort == "joined_at":
+        # Page through users first, then aggregate purchases for that page only
+        if cursor:
+            joined_at, user_id = decode_cursor(cursor, 2)
+            users = users.where(
+                tuple_(UserDB.joined_at, UserDB.id) < (parse_cursor_datetime(joined_at), parse_cursor_uuid(user_id))
+            )
+        page = users.order_by(desc(UserDB.joined_at), desc(UserDB.id)).limit(limit + 1).subquery()
+        page_user = aliased(UserDB, page)
+        totals = _access_totals(UserLessonAccessDB.user_id.in_(select(page.c.id)))
+        query = select(
+            page_user,
+            func.coalesce(totals.c.total_spent, 0),
+            func.coalesce(totals.c.total_lessons, 0)
+        ).outerjoin(totals, totals.c.user_id == page_user.id).order_by(
+            desc(page_user.joined_at), desc(page_user.id)
+        )
+    else:
+        totals = _access_totals()
+        total_spent = func.coalesce(totals.c.total_spent, 0)
+        query = users.add_columns(
+            total_spent,
+            func.coalesce(totals.c.total_lessons, 0)
+        ).outerjoin(totals, totals.c.user_id == UserDB.id)
+        if cursor:
+            spent, user_id = decode_cursor(cursor, 2)
+            if not isinstance(spent, int):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query = query.where(tuple_(total_spent, UserDB.id) < (spent, parse_cursor_uuid(user_id)))
+        query = query.order_by(desc(total_spent), desc(UserDB.id)).limit(limit + 1)
+    
+    rows = db.execute(query).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
-    for user in users:
-        total_spent = db.query(func.sum(UserLessonAccessDB.amount)).filter(
-            UserLessonAccessDB.user_id == user.id
-        ).scalar() or 0
-        
-        total_lessons = db.query(func.count(UserLessonAccessDB.id)).filter(
-            UserLessonAccessDB.user_id == user.id
-        ).scalar() or 0
-        
+    result = []
+    for user, total_spent, total_lessons in rows:
         result.append({
             "id": str(user.id),
             "full_name": user.full_name,
@@ -64,11 +122,26 @@ async def get_all_users(
             "total_spent": total_spent
         })
     
-    return result
+    next_cursor = None
+    if has_more:
+        last = result[-1]
+        sort_value = last["joined_at"] if sort == "joined_at" else last["total_spent"]
+        next_cursor = encode_cursor([sort_value, last["id"]])
+    
+    # Large lists: render with orjson directly, skipping jsonable_encoder
+    return ORJSONResponse({
+        "data": result,
+        "meta": {
+            "limit": limit,
+            "sort": sort,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }
+    })
 
 
 @router.delete("/users/{user_id}")
-async def delete_user(
+def delete_user(
     user_id: str,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -77,13 +150,20 @@ async def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # Take the user's purchases and registration out of the dashboard rollups
+    for stmt in rollups.user_removed(user.id):
+        db.execute(stmt)
+    
     # Delete related records first
     db.query(UserLessonAccessDB).filter(UserLessonAccessDB.user_id == user_id).delete()
     db.query(UserTestResultDB).filter(UserTestResultDB.user_id == user_id).delete()
+    db.query(TestSubmissionKeyDB).filter(TestSubmissionKeyDB.user_id == user_id).delete()
     
     # Delete user
+    telegram_id = user.telegram_id
     db.delete(user)
     db.commit()
+    shared_cache.invalidate_sync("users", telegram_id)
     
     return {"message": "User deleted successfully"}
 
@@ -102,26 +182,44 @@ class LessonUpdate(BaseModel):
 class LessonPublish(BaseModel):
     is_published: bool
 
+def _lesson_stats(db: Session, lesson_id=None) -> dict:
+    """Per-lesson purchase and test stats from two grouped queries"""
+    purchases = db.query(
+        UserLessonAccessDB.lesson_id,
+        func.count(UserLessonAccessDB.id),
+        func.sum(UserLessonAccessDB.amount)
+    )
+    tests = db.query(
+        UserTestResultDB.lesson_id,
+        func.count(UserTestResultDB.id),
+        func.avg(UserTestResultDB.score)
+    )
+    if lesson_id is not None:
+        purchases = purchases.filter(UserLessonAccessDB.lesson_id == lesson_id)
+        tests = tests.filter(UserTestResultDB.lesson_id == lesson_id)
+    
+    stats = {}
+    empty = {"total_users": 0, "total_revenue": 0, "test_takers": 0, "average_score": 0}
+    for lid, total_users, total_revenue in purchases.group_by(UserLessonAccessDB.lesson_id):
+        stats[lid] = dict(empty, total_users=total_users, total_revenue=total_revenue or 0)
+    for lid, test_takers, avg_score in tests.group_by(UserTestResultDB.lesson_id):
+        stats.setdefault(lid, dict(empty)).update(
+            test_takers=test_takers,
+            average_score=round(float(avg_score), 1) if avg_score else 0
+        )
+    return stats
+
 @router.get("/lessons")
-async def get_all_lessons(
+def get_all_lessons(
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
 ):
     lessons = db.query(LessonDB).all()
+    stats = _lesson_stats(db)
     result = []
     
     for lesson in lessons:
-        total_users = db.query(func.count(UserLessonAccessDB.id)).filter(
-            UserLessonAccessDB.lesson_id == lesson.id
-        ).scalar() or 0
-        
-        total_revenue = db.query(func.sum(UserLessonAccessDB.amount)).filter(
-            UserLessonAccessDB.lesson_id == lesson.id
-        ).scalar() or 0
-        
-        avg_score = db.query(func.avg(UserTestResultDB.score)).filter(
-            UserTestResultDB.lesson_id == lesson.id
-        ).scalar() or 0
+        lesson_stats = stats.get(lesson.id, {})
         
         result.append({
             "id": str(lesson.id),
@@ -132,15 +230,15 @@ async def get_all_lessons(
             "ppt_url": lesson.ppt_url,
             "is_published": lesson.is_published,
             "created_at": lesson.created_at,
-            "total_users": total_users,
-            "total_revenue": total_revenue,
-            "average_score": round(float(avg_score), 1) if avg_score else 0
+            "total_users": lesson_stats.get("total_users", 0),
+            "total_revenue": lesson_stats.get("total_revenue", 0),
+            "average_score": lesson_stats.get("average_score", 0)
         })
     
     return result
 
 @router.post("/lessons")
-async def create_lesson(
+def create_lesson(
     lesson_data: LessonCreate,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -170,7 +268,7 @@ async def create_lesson(
     }
 
 @router.put("/lessons/{lesson_id}")
-async def update_lesson(
+def update_lesson(
     lesson_id: str,
     lesson_data: LessonUpdate,
     db: Session = Depends(get_db),
@@ -186,6 +284,7 @@ async def update_lesson(
     
     db.commit()
     db.refresh(lesson)
+    shared_cache.invalidate_sync("lessons", "catalog")
     
     return {
         "id": str(lesson.id),
@@ -199,7 +298,7 @@ async def update_lesson(
     }
 
 @router.delete("/lessons/{lesson_id}")
-async def delete_lesson(
+def delete_lesson(
     lesson_id: str,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -212,14 +311,17 @@ async def delete_lesson(
     db.query(TestQuestionDB).filter(TestQuestionDB.lesson_id == lesson_id).delete()
     db.query(UserLessonAccessDB).filter(UserLessonAccessDB.lesson_id == lesson_id).delete()
     db.query(UserTestResultDB).filter(UserTestResultDB.lesson_id == lesson_id).delete()
+    db.execute(rollups.lesson_removed(lesson.id))
     
     db.delete(lesson)
     db.commit()
+    shared_cache.invalidate_sync("questions", lesson.id)
+    shared_cache.invalidate_sync("lessons", "catalog")
     
     return {"message": "Lesson deleted successfully"}
 
 @router.put("/lessons/{lesson_id}/publish")
-async def publish_lesson(
+def publish_lesson(
     lesson_id: str,
     publish_data: LessonPublish,
     db: Session = Depends(get_db),
@@ -231,6 +333,7 @@ async def publish_lesson(
     
     lesson.is_published = publish_data.is_published
     db.commit()
+    shared_cache.invalidate_sync("lessons", "catalog")
     
     return {
         "id": str(lesson.id),
@@ -243,7 +346,7 @@ async def publish_lesson(
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
 @router.post("/lessons/{lesson_id}/upload/pdf")
-async def upload_lesson_pdf(
+def upload_lesson_pdf(
     lesson_id: str,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -271,7 +374,7 @@ async def upload_lesson_pdf(
     return {"pdf_url": pdf_url, "lesson_id": lesson_id}
 
 @router.post("/lessons/{lesson_id}/upload/ppt")
-async def upload_lesson_ppt(
+def upload_lesson_ppt(
     lesson_id: str,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -315,7 +418,7 @@ class QuestionUpdate(BaseModel):
     correct_option: Optional[int] = None
 
 @router.get("/lessons/{lesson_id}/questions")
-async def get_lesson_questions(
+def get_lesson_questions(
     lesson_id: str,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -340,7 +443,7 @@ async def get_lesson_questions(
     ]
 
 @router.post("/lessons/{lesson_id}/questions")
-async def create_question(
+def create_question(
     lesson_id: str,
     question_data: QuestionCreate,
     db: Session = Depends(get_db),
@@ -366,6 +469,7 @@ async def create_question(
     db.add(question)
     db.commit()
     db.refresh(question)
+    shared_cache.invalidate_sync("questions", question.lesson_id)
     
     return {
         "id": str(question.id),
@@ -376,7 +480,7 @@ async def create_question(
     }
 
 @router.put("/questions/{question_id}")
-async def update_question(
+def update_question(
     question_id: str,
     question_data: QuestionUpdate,
     db: Session = Depends(get_db),
@@ -404,6 +508,7 @@ async def update_question(
     
     db.commit()
     db.refresh(question)
+    shared_cache.invalidate_sync("questions", question.lesson_id)
     
     return {
         "id": str(question.id),
@@ -414,7 +519,7 @@ async def update_question(
     }
 
 @router.delete("/questions/{question_id}")
-async def delete_question(
+def delete_question(
     question_id: str,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -425,14 +530,16 @@ async def delete_question(
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     
+    lesson_id = question.lesson_id
     db.delete(question)
     db.commit()
+    shared_cache.invalidate_sync("questions", lesson_id)
     
     return {"message": "Question deleted successfully"}
 
 # Analytics & Reports Endpoints
 @router.get("/lessons/{lesson_id}/analytics")
-async def get_lesson_analytics(
+def get_lesson_analytics(
     lesson_id: str,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -442,22 +549,13 @@ async def get_lesson_analytics(
         raise HTTPException(status_code=404, detail="Lesson not found")
     
     # Basic stats
-    total_students = db.query(func.count(UserLessonAccessDB.id)).filter(
-        UserLessonAccessDB.lesson_id == lesson_id
-    ).scalar() or 0
-    
-    total_revenue = db.query(func.sum(UserLessonAccessDB.amount)).filter(
-        UserLessonAccessDB.lesson_id == lesson_id
-    ).scalar() or 0
-    
-    avg_score = db.query(func.avg(UserTestResultDB.score)).filter(
-        UserTestResultDB.lesson_id == lesson_id
-    ).scalar() or 0
+    lesson_stats = _lesson_stats(db, lesson.id).get(lesson.id, {})
+    total_students = lesson_stats.get("total_users", 0)
+    total_revenue = lesson_stats.get("total_revenue", 0)
+    avg_score = lesson_stats.get("average_score", 0)
     
     # Completion rate
-    test_takers = db.query(func.count(UserTestResultDB.id.distinct())).filter(
-        UserTestResultDB.lesson_id == lesson_id
-    ).scalar() or 0
+    test_takers = lesson_stats.get("test_takers", 0)
     
     completion_rate = (test_takers / total_students * 100) if total_students > 0 else 0
     
@@ -473,7 +571,7 @@ async def get_lesson_analytics(
         "lesson_title": lesson.title,
         "total_students": total_students,
         "total_revenue": total_revenue,
-        "average_score": round(float(avg_score), 1) if avg_score else 0,
+        "average_score": avg_score,
         "completion_rate": round(completion_rate, 1),
         "recent_purchases": [
             {
@@ -487,7 +585,7 @@ async def get_lesson_analytics(
     }
 
 @router.get("/lessons/{lesson_id}/results")
-async def get_lesson_results(
+def get_lesson_results(
     lesson_id: str,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -521,35 +619,52 @@ async def get_lesson_results(
             "ended_at": result.ended_at
         })
     
-    return result_list
+    return ORJSONResponse(result_list)
 
 @router.get("/dashboard")
-async def get_dashboard_stats(
+def get_dashboard_stats(
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
 ):
-    # Basic totals
-    total_users = db.query(func.count(UserDB.id)).scalar() or 0
-    total_lessons = db.query(func.count(LessonDB.id)).scalar() or 0
-    total_revenue = db.query(func.sum(UserLessonAccessDB.amount)).scalar() or 0
-    
-    # Monthly stats
+    # Totals come from the daily rollup tables, kept up to date on every write
     current_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    monthly_revenue = db.query(func.sum(UserLessonAccessDB.amount)).filter(
-        UserLessonAccessDB.paid_at >= current_month
-    ).scalar() or 0
+    month_start = current_month.date()
+    
+    total_users, new_users_this_month = db.query(
+        func.coalesce(func.sum(DailyRegistrationsDB.registrations), 0),
+        func.coalesce(func.sum(DailyRegistrationsDB.registrations).filter(
+            DailyRegistrationsDB.day >= month_start
+        ), 0)
+    ).one()
+    
+    total_revenue, monthly_revenue, total_test_completions, monthly_test_completions = db.query(
+        func.coalesce(func.sum(DailyLessonStatsDB.revenue), 0),
+        func.coalesce(func.sum(DailyLessonStatsDB.revenue).filter(
+            DailyLessonStatsDB.day >= month_start
+        ), 0),
+        func.coalesce(func.sum(DailyLessonStatsDB.test_completions), 0),
+        func.coalesce(func.sum(DailyLessonStatsDB.test_completions).filter(
+            DailyLessonStatsDB.day >= month_start
+        ), 0)
+    ).one()
     
-    new_users_this_month = db.query(func.count(UserDB.id)).filter(
-        UserDB.joined_at >= current_month
-    ).scalar() or 0
+    total_lessons = db.query(func.count(LessonDB.id)).scalar() or 0
     
     # Most popular lessons
+    lesson_totals = db.query(
+        DailyLessonStatsDB.lesson_id,
+        func.sum(DailyLessonStatsDB.purchases).label('student_count'),
+        func.sum(DailyLessonStatsDB.revenue).label('revenue')
+    ).group_by(DailyLessonStatsDB.lesson_id).subquery()
+    
     popular_lessons = db.query(
         LessonDB,
-        func.count(UserLessonAccessDB.id).label('student_count'),
-        func.sum(UserLessonAccessDB.amount).label('revenue')
-    ).join(UserLessonAccessDB).group_by(LessonDB.id).order_by(
-        desc('student_count')
+        lesson_totals.c.student_count,
+        lesson_totals.c.revenue
+    ).join(lesson_totals, lesson_totals.c.lesson_id == LessonDB.id).filter(
+        lesson_totals.c.student_count > 0
+    ).order_by(
+        desc(lesson_totals.c.student_count)
     ).limit(5).all()
     
     # Recent activity (last 20 activities)
@@ -596,6 +711,8 @@ async def get_dashboard_stats(
         "total_revenue": total_revenue,
         "monthly_revenue": monthly_revenue,
         "new_users_this_month": new_users_this_month,
+        "total_test_completions": total_test_completions,
+        "test_completions_this_month": monthly_test_completions,
         "most_popular_lessons": [
             {
                 "lesson_id": str(lesson.id),
@@ -608,9 +725,14 @@ async def get_dashboard_stats(
         "recent_activity": activities
     }
 
+@router.get("/metrics")
+def get_metrics(_: dict = Depends(verify_token)):
+    """Runtime metrics: connection pools, caches, background jobs"""
+    return collect_metrics()
+
 # Access Management Endpoints
 @router.get("/access/all")
-async def get_all_access(
+def get_all_access(
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
 ):
@@ -620,7 +742,7 @@ async def get_all_access(
         desc(UserLessonAccessDB.paid_at)
     ).all()
     
-    return [
+    return ORJSONResponse([
         {
             "id": str(access.id),
             "user_id": str(user.id),
@@ -632,7 +754,7 @@ async def get_all_access(
             "notes": access.notes
         }
         for access, user, lesson in access_records
-    ]
+    ])
 
 class GrantAccessRequest(BaseModel):
     user_id: str
@@ -641,7 +763,7 @@ class GrantAccessRequest(BaseModel):
     notes: str = "Admin granted access"
 
 @router.post("/access/grant")
-async def grant_access(
+def grant_access(
     request: GrantAccessRequest,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -677,6 +799,7 @@ async def grant_access(
     )
     
     db.add(access)
+    db.execute(rollups.purchase(lesson.id, access.amount, access.paid_at))
     db.commit()
     db.refresh(access)
     
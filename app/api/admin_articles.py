@@ -3,19 +3,21 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, text
 from typing import List, Optional
 from datetime import datetime
-import math
 import uuid
 
 from app.core.database import get_db
 from app.core.auth import verify_token
 from app.models.article import ArticleDB, Article, ArticleCreate, ArticleUpdate, CategoryDB, Category, CategoryCreate, CategoryUpdate
+from app.services import article_search, catalog_version, importance
 
+# Admin routes run on the sync Session; they are plain `def` so FastAPI
+# executes them in its threadpool instead of blocking the event loop.
 router = APIRouter(prefix="/admin", tags=["admin-articles"])
 
 # --- Categories ---
 
 @router.post("/categories", response_model=Category)
-async def create_category(
+def create_category(
     category_data: CategoryCreate,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -27,19 +29,20 @@ async def create_category(
         
     category = CategoryDB(**category_data.dict())
     db.add(category)
+    db.execute(catalog_version.bump())
     db.commit()
     db.refresh(category)
     return category
 
 @router.get("/categories", response_model=List[Category])
-async def get_all_categories(
+def get_all_categories(
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
 ):
     return db.query(CategoryDB).all()
 
 @router.put("/categories/{category_id}", response_model=Category)
-async def update_category(
+def update_category(
     category_id: uuid.UUID,
     category_data: CategoryUpdate,
     db: Session = Depends(get_db),
@@ -60,12 +63,13 @@ async def update_category(
     for field, value in update_data.items():
         setattr(category, field, value)
         
+    db.execute(catalog_version.bump())
     db.commit()
     db.refresh(category)
     return category
 
 @router.delete("/categories/{category_id}")
-async def delete_category(
+def delete_category(
     category_id: uuid.UUID,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -80,13 +84,14 @@ async def delete_category(
         raise HTTPException(status_code=400, detail="Cannot delete category with existing articles")
         
     db.delete(category)
+    db.execute(catalog_version.bump())
     db.commit()
     return {"message": "Category deleted successfully"}
 
 # --- Articles ---
 
 @router.get("/articles", response_model=dict)
-async def get_all_articles(
+def get_all_articles(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
     search: Optional[str] = None,
@@ -103,14 +108,13 @@ async def get_all_articles(
         query = query.join(CategoryDB).filter(CategoryDB.slug == category)
         
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (ArticleDB.title.ilike(search_term)) | 
-            (ArticleDB.content.ilike(search_term))
-        )
+        query = query.filter(article_search.matches(search))
         
-    # Default sort by created_at desc
-    query = query.order_by(desc(ArticleDB.created_at))
+    # Default sort by created_at desc; searches are ranked by relevance first
+    if search:
+        query = query.order_by(desc(article_search.rank(search)), desc(ArticleDB.created_at))
+    else:
+        query = query.order_by(desc(ArticleDB.created_at))
     
     # Pagination
     total = query.count()
@@ -146,7 +150,7 @@ async def get_all_articles(
     }
 
 @router.post("/articles", response_model=Article)
-async def create_article(
+def create_article(
     article_data: ArticleCreate,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -167,12 +171,13 @@ async def create_article(
         article.published_at = datetime.utcnow()
         
     db.add(article)
+    db.execute(catalog_version.bump())
     db.commit()
     db.refresh(article)
     return article
 
 @router.get("/articles/{article_id}", response_model=Article)
-async def get_article(
+def get_article(
     article_id: uuid.UUID,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -183,7 +188,7 @@ async def get_article(
     return article
 
 @router.put("/articles/{article_id}", response_model=Article)
-async def update_article(
+def update_article(
     article_id: uuid.UUID,
     article_data: ArticleUpdate,
     db: Session = Depends(get_db),
@@ -208,12 +213,13 @@ async def update_article(
     if article.is_published and not article.published_at:
         article.published_at = datetime.utcnow()
         
+    db.execute(catalog_version.bump())
     db.commit()
     db.refresh(article)
     return article
 
 @router.delete("/articles/{article_id}")
-async def delete_article(
+def delete_article(
     article_id: uuid.UUID,
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
@@ -223,46 +229,32 @@ async def delete_article(
         raise HTTPException(status_code=404, detail="Article not found")
         
     db.delete(article)
+    db.execute(catalog_version.bump())
     db.commit()
     return {"message": "Article deleted successfully"}
 
 # --- Importance Calculation ---
 
 @router.post("/articles/calculate-importance")
-async def calculate_importance(
+def calculate_importance(
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
 ):
     """
-    Recalculate importance score for all articles.
+    Recalculate importance score for all articles now.
     Logic: score = log(view_count + 1) * 10 + (100 / days_since_published + 1)
+
+    The same recalculation also runs in the background on a schedule.
     """
-    articles = db.query(ArticleDB).filter(ArticleDB.is_published == True).all()
-    now = datetime.utcnow()
-    count = 0
-    
-    for article in articles:
-        days_since = 1
-        if article.published_at:
-            delta = now - article.published_at
-            days_since = max(1, delta.days)
-            
-        # Logarithmic view count impact (diminishing returns)
-        view_score = math.log10(article.view_count + 1) * 10
-        
-        # Freshness impact (decays over time)
-        freshness_score = 100 / days_since
-        
-        article.importance_score = view_score + freshness_score
-        count += 1
-        
-    db.commit()
-    return {"message": f"Recalculated importance for {count} articles"}
+    count = importance.recalculate(db)
+    if count == importance.SKIPPED:
+        return {"message": "Recalculation already in progress"}
+    return {"message": f"Recalculated importance, {count} articles changed", "stats": importance.runs.stats()}
 
 # --- Stats ---
 
 @router.get("/articles/stats")
-async def get_article_stats(
+def get_article_stats(
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
 ):
@@ -291,7 +283,7 @@ async def get_article_stats(
 # --- File Upload ---
 
 @router.post("/articles/upload/image")
-async def upload_image(
+def upload_image(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     _: dict = Depends(verify_token)
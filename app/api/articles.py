@@ -1,87 +1,245 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, text
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, desc, text, tuple_
+from datetime import datetime
 from typing import List, Optional
+import time
 import uuid
 
-from app.core.database import get_db
-from app.models.article import ArticleDB, Article, CategoryDB, Category, ArticleListResponse
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.http_cache import weak_etag, is_not_modified, not_modified, set_cache_headers
+from app.models.article import ArticleDB, Article, CategoryDB, Category, ArticleListResponse, SORT_NULLS
+from app.services import article_search, catalog_version
+from app.services.cache import shared_cache
+from app.services.view_counter import view_counter
+from app.utils.pagination import encode_cursor, decode_cursor, parse_cursor_datetime, parse_cursor_uuid
 
 router = APIRouter(prefix="/v1/articles", tags=["articles"])
 
+# Keyset sort keys; every order is tie-broken on id so cursors are stable
+KEYSET_SORTS = {
+    "latest": ArticleDB.published_at,
+    "popular": ArticleDB.view_count,
+    "important": ArticleDB.importance_score,
+    "trending": ArticleDB.trending_score,
+}
+
+def _sort_key(column):
+    """Sort expression of a keyset column, NULLs replaced as in its index"""
+    null = SORT_NULLS.get(column.key)
+    return column if null is None else func.coalesce(column, null)
+
+def _parse_sort_value(sort: str, value):
+    column = KEYSET_SORTS[sort]
+    if value is None and column.key in SORT_NULLS:
+        return SORT_NULLS[column.key]  # The cursor row had no value
+    if sort == "latest":
+        return parse_cursor_datetime(value)
+    if sort == "popular" and isinstance(value, int):
+        return value
+    if sort in ("important", "trending") and isinstance(value, (int, float)):
+        return float(value)
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _catalog_state(db: AsyncSession):
+    """(version, changed_at) of the article catalog"""
+    row = (await db.execute(catalog_version.current())).first()
+    return tuple(row) if row else (0, None)
+
+def _views_window():
+    """(number, start) of the current max-age window.
+
+    View flushes change view counts (and the popular/trending orders) without
+    bumping the catalog version or updated_at. Validators of responses that
+    carry view counts include the window, so they are renewed every max-age.
+    """
+    length = max(settings.HTTP_CACHE_MAX_AGE, 1)
+    number = int(time.time()) // length
+    return number, datetime.utcfromtimestamp(number * length)
+
+def _last_modified(changed_at: Optional[datetime], window_start: datetime) -> datetime:
+    return max(changed_at, window_start) if changed_at else window_start
+
+def _list_etag(kind: str, version: int, request: Request, *parts) -> str:
+    return weak_etag(kind, version, sorted(request.query_params.multi_items()), *parts)
+
 @router.get("", response_model=ArticleListResponse)
 async def get_articles(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    with_total: bool = True,
     category: Optional[str] = None,
     tag: Optional[str] = None,
     search: Optional[str] = None,
-    sort: str = Query("latest", regex="^(latest|popular|important)$"),
-    db: Session = Depends(get_db)
+    sort: Optional[str] = Query(None, regex="^(latest|popular|important|trending|relevance)$"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(ArticleDB).filter(ArticleDB.is_published == True)
-    
+    """
+    Page mode (`page`) or cursor mode (`cursor` = `meta.next_cursor` of the
+    previous response, `page` is then ignored). Pass `with_total=false` to
+    skip counting all matching articles.
+    """
+    version, changed_at = await _catalog_state(db)
+    window, window_start = _views_window()
+    etag = _list_etag("articles", version, request, window)
+    last_modified = _last_modified(changed_at, window_start)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    async def load_page():
+        return await _article_page(db, page, limit, cursor, with_total, category, tag, search, sort)
+
+    # The ETag covers the catalog version and all query parameters, so it is
+    # the cache key as well; admin changes move to a new key
+    body = await shared_cache.get_or_load("article_pages", etag, load_page, ttl=settings.ARTICLE_PAGE_CACHE_TTL)
+    set_cache_headers(response, etag, last_modified)
+    return body
+
+async def _article_page(
+    db: AsyncSession,
+    page: int,
+    limit: int,
+    cursor: Optional[str],
+    with_total: bool,
+    category: Optional[str],
+    tag: Optional[str],
+    search: Optional[str],
+    sort: Optional[str]
+) -> dict:
+    """One page of the listing as a JSON-ready dict"""
+    query = select(ArticleDB).where(ArticleDB.is_published == True)
+
     # Filter by category slug
     if category:
-        query = query.join(CategoryDB).filter(CategoryDB.slug == category)
-        
+        query = query.join(CategoryDB).where(CategoryDB.slug == category)
+
     # Filter by tag
     if tag:
         # PostgreSQL array overlap check
         # This assumes tags are stored as ARRAY(String)
-        query = query.filter(ArticleDB.tags.contains([tag]))
-        
-    # Search in title or content
+        query = query.where(ArticleDB.tags.contains([tag]))
+
+    # Full-text search in title, excerpt and content
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (ArticleDB.title.ilike(search_term)) | 
-            (ArticleDB.content.ilike(search_term))
-        )
-        
-    # Sorting
-    if sort == "latest":
-        query = query.order_by(desc(ArticleDB.published_at))
-    elif sort == "popular":
-        query = query.order_by(desc(ArticleDB.view_count))
-    elif sort == "important":
-        query = query.order_by(desc(ArticleDB.importance_score))
-        
+        query = query.where(article_search.matches(search))
+
+    # Searches are ranked by relevance unless another order is asked for
+    if sort is None or (sort == "relevance" and not search):
+        sort = "relevance" if search else "latest"
+
     # Pagination
-    total = query.count()
-    offset = (page - 1) * limit
-    articles = query.offset(offset).limit(limit).all()
-    
+    total = await db.scalar(select(func.count()).select_from(query.subquery())) if with_total else None
+
+    # Sorting
+    if sort in KEYSET_SORTS:
+        sort_column = KEYSET_SORTS[sort]
+        query = query.order_by(desc(_sort_key(sort_column)), desc(ArticleDB.id))
+    elif sort == "relevance":
+        query = query.order_by(
+            desc(article_search.rank(search)), desc(ArticleDB.published_at).nulls_last(), desc(ArticleDB.id)
+        )
+
+    if cursor:
+        if sort not in KEYSET_SORTS:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not available for this sort")
+        cursor_sort, value, article_id = decode_cursor(cursor, 3)
+        if cursor_sort != sort:
+            raise HTTPException(status_code=400, detail="Cursor does not match the sort order")
+        query = query.where(
+            tuple_(_sort_key(sort_column), ArticleDB.id)
+            < tuple_(_parse_sort_value(sort, value), parse_cursor_uuid(article_id))
+        )
+    else:
+        query = query.offset((page - 1) * limit)
+
+    # Category is serialized with every article, load it up front (no lazy loads in async)
+    query = query.options(selectinload(ArticleDB.category)).limit(limit + 1)
+    rows = (await db.scalars(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and sort in KEYSET_SORTS:
+        last = rows[-1]
+        next_cursor = encode_cursor([sort, getattr(last, sort_column.key), str(last.id)])
+
+    articles = [Article.model_validate(article) for article in rows]
+
+    if search and articles:
+        snippets = dict((await db.execute(
+            article_search.headlines(search, [article.id for article in articles])
+        )).all())
+        for article in articles:
+            article.headline = snippets.get(article.id)
+
     return {
-        "data": articles,
+        "data": [article.model_dump(mode="json") for article in articles],
         "meta": {
             "total": total,
-            "page": page,
+            "page": None if cursor else page,
             "limit": limit,
-            "pages": (total + limit - 1) // limit
+            "pages": (total + limit - 1) // limit if total is not None else None,
+            "next_cursor": next_cursor,
+            "has_more": has_more
         }
     }
 
 @router.get("/categories", response_model=List[Category])
-async def get_categories(db: Session = Depends(get_db)):
-    return db.query(CategoryDB).all()
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    version, changed_at = await _catalog_state(db)
+    etag = _list_etag("categories", version, request)
+    if is_not_modified(request, etag, changed_at):
+        return not_modified(etag, changed_at)
+
+    set_cache_headers(response, etag, changed_at)
+    return (await db.scalars(select(CategoryDB))).all()
 
 @router.get("/{slug}", response_model=Article)
 async def get_article(
     slug: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    article = db.query(ArticleDB).filter(
-        ArticleDB.slug == slug,
-        ArticleDB.is_published == True
-    ).first()
-    
-    if not article:
+    # Validators first: a cheap Core row instead of the full ORM article
+    head = (await db.execute(
+        select(ArticleDB.id, ArticleDB.updated_at, catalog_version.current_version())
+        .where(
+            ArticleDB.slug == slug,
+            ArticleDB.is_published == True
+        )
+    )).first()
+
+    if not head:
         raise HTTPException(status_code=404, detail="Article not found")
-        
-    # Increment view count
-    article.view_count += 1
-    db.commit()
-    db.refresh(article)
-    
-    return article
+
+    article_id, updated_at, version = head
+    # Count the view in memory; view_counter flushes it in the background
+    view_counter.record(article_id)
+
+    window, window_start = _views_window()
+    etag = weak_etag("article", article_id, updated_at, version, window)
+    last_modified = _last_modified(updated_at, window_start)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    article = await db.scalar(
+        select(ArticleDB)
+        .options(selectinload(ArticleDB.category))
+        .where(ArticleDB.id == article_id)
+    )
+
+    result = Article.model_validate(article)
+    result.view_count = (article.view_count or 0) + view_counter.pending(article.id)
+
+    set_cache_headers(response, etag, last_modified)
+    return result
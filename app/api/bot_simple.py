@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Header
+from sqlalchemy import select, func, and_, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.models.user import UserDB
 from app.models.lesson import LessonDB
 from app.models.test_result import UserTestResultDB
 from app.models.test_question import TestQuestionDB
 from app.models.access import UserLessonAccessDB
+from app.services import rollups, idempotency
+from app.services.cache import shared_cache
+from app.services.question_cache import question_cache, QuestionSet
+from app.services.user_cache import user_cache, cache_user, CachedUser
 from pydantic import BaseModel
 import logging
 import uuid
@@ -29,13 +36,69 @@ class TestAnswer(BaseModel):
 class TestSubmission(BaseModel):
     answers: List[TestAnswer]
 
+async def resolve_user(db: AsyncSession, telegram_id: int) -> CachedUser:
+    """Map a Telegram ID to the user, served from the user cache; 404 if unknown"""
+    user = user_cache.get(telegram_id)
+    if user is None:
+        db_user = await db.scalar(select(UserDB).where(UserDB.telegram_id == telegram_id))
+        if not db_user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = cache_user(db_user)
+    return user
+
+async def get_test_questions(db: AsyncSession, user_id: uuid.UUID, lesson_id: str) -> QuestionSet:
+    """Lesson questions and answer key for a user who has access to the lesson.
+
+    Lesson existence, the access check and (on a question cache miss) the
+    questions themselves come from a single query.
+    """
+    try:
+        lesson_uuid = uuid.UUID(lesson_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid lesson ID format")
+
+    has_access = exists().where(
+        UserLessonAccessDB.user_id == user_id,
+        UserLessonAccessDB.lesson_id == LessonDB.id
+    ).label("has_access")
+    query = select(LessonDB.id, has_access).where(LessonDB.id == lesson_uuid)
+
+    question_set = question_cache.get(lesson_uuid)
+    if question_set is None:
+        version = question_cache.version(lesson_uuid)
+        query = query.add_columns(TestQuestionDB).outerjoin(TestQuestionDB, TestQuestionDB.lesson_id == LessonDB.id)
+
+    rows = (await db.execute(query)).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    if not rows[0].has_access:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    if question_set is None:
+        questions = [row.TestQuestionDB for row in rows if row.TestQuestionDB is not None]
+        question_set = question_cache.put(lesson_uuid, version, questions)
+    return question_set
+
+async def get_lesson_catalog(db: AsyncSession) -> List[dict]:
+    """Published lessons in catalog order, shared by all workers through shared_cache"""
+    async def load():
+        rows = (await db.execute(
+            select(LessonDB.id, LessonDB.title, LessonDB.description)
+            .where(LessonDB.is_published == True)
+            .order_by(LessonDB.created_at, LessonDB.id)
+        )).all()
+        return [{"id": str(row.id), "title": row.title, "description": row.description} for row in rows]
+
+    return await shared_cache.get_or_load("lessons", "catalog", load, ttl=settings.LESSON_CATALOG_CACHE_TTL)
+
 @router.post("/register")
-async def register_user(user_data: UserRegistration, db: Session = Depends(get_db)):
+async def register_user(user_data: UserRegistration, db: AsyncSession = Depends(get_async_db)):
     """Register a new user from Telegram bot"""
     try:
         # Check if user already exists
-        existing_user = db.query(UserDB).filter(UserDB.telegram_id == user_data.telegram_id).first()
+        existing_user = await db.scalar(select(UserDB).where(UserDB.telegram_id == user_data.telegram_id))
         if existing_user:
+            cache_user(existing_user)
             return {"message": "User already registered", "user_id": str(existing_user.id)}
         
         # Create new user
@@ -46,8 +109,10 @@ async def register_user(user_data: UserRegistration, db: Session = Depends(get_d
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.execute(rollups.registration())
+        await db.commit()
+        await db.refresh(new_user)
+        cache_user(new_user)
         
         logger.info(f"User registered: {user_data.telegram_id} - {user_data.full_name}")
         
@@ -59,50 +124,57 @@ async def register_user(user_data: UserRegistration, db: Session = Depends(get_d
         
     except Exception as e:
         logger.error(f"Error registering user {user_data.telegram_id}: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Registration failed")
 
+@router.api_route("/user/{telegram_id}/exists", methods=["GET", "HEAD"])
+async def user_exists(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Cheap registration check: 200 if the user is registered, 404 otherwise"""
+    await resolve_user(db, telegram_id)
+    return {"exists": True}
+
 @router.get("/user/{telegram_id}/lessons")
-async def get_user_lessons(telegram_id: int, db: Session = Depends(get_db)):
+async def get_user_lessons(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get lessons available to user"""
     try:
         # Get user
-        user = db.query(UserDB).filter(UserDB.telegram_id == telegram_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        user = await resolve_user(db, telegram_id)
+        
+        # The catalog is cached; only this user's access and results hit the database
+        catalog = await get_lesson_catalog(db)
+        rows = (await db.execute(
+            select(
+                UserLessonAccessDB.lesson_id,
+                UserLessonAccessDB.amount,
+                UserTestResultDB.id.label("result_id"),
+                UserTestResultDB.score
+            )
+            .outerjoin(UserTestResultDB, and_(
+                UserTestResultDB.lesson_id == UserLessonAccessDB.lesson_id,
+                UserTestResultDB.user_id == user.id
+            ))
+            .where(UserLessonAccessDB.user_id == user.id)
+        )).all()
+        
+        # Duplicate access rows would repeat a lesson; keep the first
+        purchases = {}
+        for row in rows:
+            purchases.setdefault(str(row.lesson_id), row)
         
-        # Get all lessons with access information
-        lessons = db.query(LessonDB).all()
         result = []
-        
-        for lesson in lessons:
-            # Check if user has access
-            access = db.query(UserLessonAccessDB).filter(
-                UserLessonAccessDB.user_id == user.id,
-                UserLessonAccessDB.lesson_id == lesson.id
-            ).first()
-            
-            has_access = access is not None
-            
-            # Get test result if user has taken the test
-            test_result = None
-            score = None
-            if has_access:
-                test_result = db.query(UserTestResultDB).filter(
-                    UserTestResultDB.user_id == user.id,
-                    UserTestResultDB.lesson_id == lesson.id
-                ).first()
-                if test_result:
-                    score = test_result.score
+        for lesson in catalog:
+            purchase = purchases.get(lesson["id"])
+            has_access = purchase is not None
+            test_completed = has_access and purchase.result_id is not None
             
             lesson_data = {
-                "id": str(lesson.id),
-                "title": lesson.title,
-                "description": lesson.description,
-                "price": access.amount if access else 50000,  # Default price
+                "id": lesson["id"],
+                "title": lesson["title"],
+                "description": lesson["description"],
+                "price": purchase.amount if has_access else 50000,  # Default price
                 "has_access": has_access,
-                "score": score,
-                "test_completed": test_result is not None
+                "score": purchase.score if test_completed else None,
+                "test_completed": test_completed
             }
             result.append(lesson_data)
         
@@ -115,13 +187,11 @@ async def get_user_lessons(telegram_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to get lessons")
 
 @router.get("/user/{telegram_id}/lesson/{lesson_id}")
-async def get_lesson_detail(telegram_id: int, lesson_id: str, db: Session = Depends(get_db)):
+async def get_lesson_detail(telegram_id: int, lesson_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get detailed lesson information"""
     try:
         # Get user
-        user = db.query(UserDB).filter(UserDB.telegram_id == telegram_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        user = await resolve_user(db, telegram_id)
         
         # Get lesson by converting string UUID to UUID object
         try:
@@ -129,23 +199,23 @@ async def get_lesson_detail(telegram_id: int, lesson_id: str, db: Session = Depe
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid lesson ID format")
         
-        lesson = db.query(LessonDB).filter(LessonDB.id == lesson_uuid).first()
+        lesson = await db.scalar(select(LessonDB).where(LessonDB.id == lesson_uuid))
         if not lesson:
             raise HTTPException(status_code=404, detail="Lesson not found")
         
         # Check access
-        access = db.query(UserLessonAccessDB).filter(
+        access = await db.scalar(select(UserLessonAccessDB).where(
             UserLessonAccessDB.user_id == user.id,
             UserLessonAccessDB.lesson_id == lesson.id
-        ).first()
+        ))
         
         has_access = access is not None
         
         # Get test result
-        test_result = db.query(UserTestResultDB).filter(
+        test_result = await db.scalar(select(UserTestResultDB).where(
             UserTestResultDB.user_id == user.id,
             UserTestResultDB.lesson_id == lesson.id
-        ).first()
+        ))
         
         lesson_data = {
             "id": str(lesson.id),
@@ -170,46 +240,16 @@ async def get_lesson_detail(telegram_id: int, lesson_id: str, db: Session = Depe
         raise HTTPException(status_code=500, detail="Failed to get lesson detail")
 
 @router.get("/user/{telegram_id}/lesson/{lesson_id}/questions")
-async def get_lesson_questions(telegram_id: int, lesson_id: str, db: Session = Depends(get_db)):
+async def get_lesson_questions(telegram_id: int, lesson_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get test questions for lesson"""
     try:
         # Get user
-        user = db.query(UserDB).filter(UserDB.telegram_id == telegram_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        user = await resolve_user(db, telegram_id)
         
-        # Get lesson by converting string UUID to UUID object
-        try:
-            lesson_uuid = uuid.UUID(lesson_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid lesson ID format")
-        
-        lesson = db.query(LessonDB).filter(LessonDB.id == lesson_uuid).first()
-        if not lesson:
-            raise HTTPException(status_code=404, detail="Lesson not found")
-        
-        # Check access
-        access = db.query(UserLessonAccessDB).filter(
-            UserLessonAccessDB.user_id == user.id,
-            UserLessonAccessDB.lesson_id == lesson.id
-        ).first()
-        
-        if not access:
-            raise HTTPException(status_code=403, detail="Access denied")
-        
-        # Get questions
-        questions = db.query(TestQuestionDB).filter(TestQuestionDB.lesson_id == lesson.id).all()
+        # Check lesson and access, get questions
+        question_set = await get_test_questions(db, user.id, lesson_id)
         
-        result = []
-        for question in questions:
-            question_data = {
-                "id": str(question.id),
-                "question_text": question.question_text,
-                "options": question.options
-            }
-            result.append(question_data)
-        
-        return result
+        return question_set.questions
         
     except HTTPException:
         raise
@@ -218,40 +258,39 @@ async def get_lesson_questions(telegram_id: int, lesson_id: str, db: Session = D
         raise HTTPException(status_code=500, detail="Failed to get questions")
 
 @router.post("/user/{telegram_id}/lesson/{lesson_id}/test")
-async def submit_test(telegram_id: int, lesson_id: str, submission: TestSubmission, db: Session = Depends(get_db)):
-    """Submit test answers"""
+async def submit_test(
+    telegram_id: int,
+    lesson_id: str,
+    submission: TestSubmission,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Submit test answers.
+
+    With an Idempotency-Key header, repeating the request (bot retries,
+    double taps) returns the first response instead of grading again.
+    """
     try:
         # Get user
-        user = db.query(UserDB).filter(UserDB.telegram_id == telegram_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Get lesson by converting string UUID to UUID object
-        try:
-            lesson_uuid = uuid.UUID(lesson_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid lesson ID format")
-        
-        lesson = db.query(LessonDB).filter(LessonDB.id == lesson_uuid).first()
-        if not lesson:
-            raise HTTPException(status_code=404, detail="Lesson not found")
+        user = await resolve_user(db, telegram_id)
         
-        # Check access
-        access = db.query(UserLessonAccessDB).filter(
-            UserLessonAccessDB.user_id == user.id,
-            UserLessonAccessDB.lesson_id == lesson.id
-        ).first()
+        # Check lesson and access, get questions
+        question_set = await get_test_questions(db, user.id, lesson_id)
+        lesson_uuid = uuid.UUID(lesson_id)
         
-        if not access:
-            raise HTTPException(status_code=403, detail="Access denied")
+        key = idempotency.validate_key(idempotency_key) if idempotency_key is not None else None
+        if key:
+            fingerprint = idempotency.request_hash(submission.model_dump()["answers"])
+            if not await db.scalar(idempotency.claim(user.id, key, lesson_uuid, fingerprint)):
+                await db.rollback()
+                row = (await db.execute(idempotency.stored(user.id, key))).first()
+                return idempotency.replay(row, lesson_uuid, fingerprint)
         
-        # Get questions
-        questions = db.query(TestQuestionDB).filter(TestQuestionDB.lesson_id == lesson.id).all()
-        question_dict = {str(q.id): q for q in questions}  # Convert question IDs to strings
+        question_dict = question_set.answer_key  # Keyed by question ID string
         
         # Calculate score and prepare detailed answers
         correct_answers = 0
-        total_questions = len(questions)
+        total_questions = len(question_set.questions)
         detailed_answers = []
         
         for answer in submission.answers:
@@ -275,54 +314,73 @@ async def submit_test(telegram_id: int, lesson_id: str, submission: TestSubmissi
         score = round((correct_answers / total_questions) * 100) if total_questions > 0 else 0
         passed = score >= 70  # 70% passing score
         
-        # Delete existing result if any
-        existing_result = db.query(UserTestResultDB).filter(
+        # Save the result, replacing an earlier attempt at this lesson. The
+        # CTE reads the earlier attempt's time in the same statement; two
+        # first attempts racing without an Idempotency-Key both see none and
+        # count twice until the next rollup backfill.
+        now = datetime.utcnow()
+        prev = select(UserTestResultDB.ended_at).where(
             UserTestResultDB.user_id == user.id,
-            UserTestResultDB.lesson_id == lesson.id
-        ).first()
-        
-        if existing_result:
-            db.delete(existing_result)
-        
-        # Create new test result
-        test_result = UserTestResultDB(
+            UserTestResultDB.lesson_id == lesson_uuid
+        ).cte("prev")
+        result_insert = insert(UserTestResultDB).values(
             user_id=user.id,
-            lesson_id=lesson.id,
+            lesson_id=lesson_uuid,
             score=score,
             total_questions=total_questions,
             answers=detailed_answers,  # Store detailed answers
-            ended_at=datetime.utcnow()
+            started_at=now,
+            ended_at=now
         )
-        
-        db.add(test_result)
-        db.commit()
-        db.refresh(test_result)
-        
-        logger.info(f"Test submitted: user {telegram_id}, lesson {lesson_id}, score {score}%")
-        
-        return {
+        saved = (await db.execute(
+            result_insert.on_conflict_do_update(
+                constraint="uq_user_test_results_user_lesson",
+                set_={
+                    "score": result_insert.excluded.score,
+                    "total_questions": result_insert.excluded.total_questions,
+                    "answers": result_insert.excluded.answers,
+                    "started_at": result_insert.excluded.started_at,
+                    "ended_at": result_insert.excluded.ended_at,
+                }
+            ).add_cte(prev).returning(
+                UserTestResultDB.id,
+                select(prev.c.ended_at).scalar_subquery().label("replaced_at")
+            )
+        )).one()
+        result_id = saved.id
+        replaced_at = saved.replaced_at
+        
+        response = {
             "score": score,
             "correct_answers": correct_answers,
             "total_questions": total_questions,
             "passed": passed,
-            "result_id": str(test_result.id)
+            "result_id": str(result_id)
         }
         
+        for stmt in rollups.test_completion(lesson_uuid, now, replaced_at):
+            await db.execute(stmt)
+        if key:
+            await db.execute(idempotency.save_response(user.id, key, response))
+        await db.commit()
+        
+        logger.info(f"Test submitted: user {telegram_id}, lesson {lesson_id}, score {score}%")
+        
+        return response
+        
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error submitting test for user {telegram_id}, lesson {lesson_id}: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to submit test")
 
 @router.get("/user/{telegram_id}/result/{result_id}")
-async def get_result_detail(telegram_id: int, result_id: str, db: Session = Depends(get_db)):
+async def get_result_detail(telegram_id: int, result_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get detailed test result"""
     try:
         # Get user
-        user = db.query(UserDB).filter(UserDB.telegram_id == telegram_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        user = await resolve_user(db, telegram_id)
         
         # Convert result_id to UUID
         try:
@@ -331,10 +389,10 @@ async def get_result_detail(telegram_id: int, result_id: str, db: Session = Depe
             raise HTTPException(status_code=400, detail="Invalid result ID format")
         
         # Get result
-        result = db.query(UserTestResultDB, LessonDB).join(LessonDB).filter(
+        result = (await db.execute(select(UserTestResultDB, LessonDB).join(LessonDB).where(
             UserTestResultDB.id == result_uuid,
             UserTestResultDB.user_id == user.id
-        ).first()
+        ))).first()
         
         if not result:
             raise HTTPException(status_code=404, detail="Result not found")
@@ -357,21 +415,19 @@ async def get_result_detail(telegram_id: int, result_id: str, db: Session = Depe
         raise HTTPException(status_code=500, detail="Failed to get result detail")
 
 @router.get("/user/{telegram_id}/results")
-async def get_user_results(telegram_id: int, limit: Optional[int] = None, db: Session = Depends(get_db)):
+async def get_user_results(telegram_id: int, limit: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
     """Get user test results"""
     try:
         # Get user
-        user = db.query(UserDB).filter(UserDB.telegram_id == telegram_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        user = await resolve_user(db, telegram_id)
         
         # Get results
-        query = db.query(UserTestResultDB, LessonDB).join(LessonDB).filter(UserTestResultDB.user_id == user.id)
+        query = select(UserTestResultDB, LessonDB).join(LessonDB).where(UserTestResultDB.user_id == user.id)
         
         if limit:
             query = query.limit(limit)
         
-        results = query.all()
+        results = (await db.execute(query)).all()
         
         result_list = []
         for test_result, lesson in results:
@@ -393,19 +449,19 @@ async def get_user_results(telegram_id: int, limit: Optional[int] = None, db: Se
         raise HTTPException(status_code=500, detail="Failed to get results")
 
 @router.get("/user/{telegram_id}/stats")
-async def get_user_stats(telegram_id: int, db: Session = Depends(get_db)):
+async def get_user_stats(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get user statistics"""
     try:
         # Get user
-        user = db.query(UserDB).filter(UserDB.telegram_id == telegram_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        user = await resolve_user(db, telegram_id)
         
         # Get stats
-        total_tests = db.query(UserTestResultDB).filter(UserTestResultDB.user_id == user.id).count()
+        total_tests = await db.scalar(
+            select(func.count(UserTestResultDB.id)).where(UserTestResultDB.user_id == user.id)
+        )
         
         # Calculate average score
-        results = db.query(UserTestResultDB).filter(UserTestResultDB.user_id == user.id).all()
+        results = (await db.scalars(select(UserTestResultDB).where(UserTestResultDB.user_id == user.id))).all()
         average_score = sum(r.score for r in results) / len(results) if results else 0
         passed_tests = sum(1 for r in results if r.score >= 70)  # 70% pass rate
         
@@ -424,25 +480,29 @@ async def get_user_stats(telegram_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to get user stats")
 
 @router.get("/user/{telegram_id}/progress")
-async def get_user_progress(telegram_id: int, db: Session = Depends(get_db)):
+async def get_user_progress(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get user learning progress"""
     try:
         # Get user
-        user = db.query(UserDB).filter(UserDB.telegram_id == telegram_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        user = await resolve_user(db, telegram_id)
         
         # Get progress data
-        total_lessons = db.query(LessonDB).count()
-        accessible_lessons = db.query(UserLessonAccessDB).filter(UserLessonAccessDB.user_id == user.id).count()
+        total_lessons = await db.scalar(select(func.count(LessonDB.id)))
+        accessible_lessons = await db.scalar(
+            select(func.count(UserLessonAccessDB.id)).where(UserLessonAccessDB.user_id == user.id)
+        )
         
-        total_tests = db.query(UserTestResultDB).filter(UserTestResultDB.user_id == user.id).count()
-        results = db.query(UserTestResultDB).filter(UserTestResultDB.user_id == user.id).all()
+        total_tests = await db.scalar(
+            select(func.count(UserTestResultDB.id)).where(UserTestResultDB.user_id == user.id)
+        )
+        results = (await db.scalars(select(UserTestResultDB).where(UserTestResultDB.user_id == user.id))).all()
         passed_tests = sum(1 for r in results if r.score >= 70)
         average_score = sum(r.score for r in results) / len(results) if results else 0
         
         # Get last test date
-        last_result = db.query(UserTestResultDB).filter(UserTestResultDB.user_id == user.id).order_by(UserTestResultDB.ended_at.desc()).first()
+        last_result = await db.scalar(
+            select(UserTestResultDB).where(UserTestResultDB.user_id == user.id).order_by(UserTestResultDB.ended_at.desc()).limit(1)
+        )
         last_test_date = last_result.ended_at.strftime("%d.%m.%Y") if last_result and last_result.ended_at else "Hali yo'q"
         
         return {
@@ -17,4 +17,65 @@ class Settings:
     GOOGLE_CLOUD_PRIVATE_KEY_ID: str = os.getenv("GOOGLE_CLOUD_PRIVATE_KEY_ID")
     GOOGLE_CLOUD_CLIENT_ID: str = os.getenv("GOOGLE_CLOUD_CLIENT_ID")
 
+    # Database connection pool. DB_MAX_CONNECTIONS is the budget for the whole
+    # deployment; it is split across WEB_CONCURRENCY workers unless DB_POOL_SIZE
+    # pins the per-engine pool size explicitly.
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "40"))
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "0"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+    # In-process caches
+    QUESTION_CACHE_MAX_LESSONS: int = int(os.getenv("QUESTION_CACHE_MAX_LESSONS", "256"))
+    QUESTION_CACHE_TTL: int = int(os.getenv("QUESTION_CACHE_TTL", "300"))
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "50000"))
+    USER_CACHE_TTL: int = int(os.getenv("USER_CACHE_TTL", "600"))
+
+    # Cache shared by all workers (app/services/cache.py). Without REDIS_URL it
+    # is kept in process, which is only correct with a single worker.
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+    CACHE_PREFIX: str = os.getenv("CACHE_PREFIX", "namoz")
+    CACHE_MEMORY_MAX_ENTRIES: int = int(os.getenv("CACHE_MEMORY_MAX_ENTRIES", "10000"))
+    LESSON_CATALOG_CACHE_TTL: int = int(os.getenv("LESSON_CATALOG_CACHE_TTL", "300"))
+    ARTICLE_PAGE_CACHE_TTL: int = int(os.getenv("ARTICLE_PAGE_CACHE_TTL", "60"))
+
+    # Article views are buffered in memory and written in batches. Views still
+    # buffered when the process stops are lost unless VIEW_FLUSH_ON_SHUTDOWN.
+    VIEW_FLUSH_INTERVAL_SECONDS: int = int(os.getenv("VIEW_FLUSH_INTERVAL_SECONDS", "10"))
+    VIEW_FLUSH_ON_SHUTDOWN: bool = os.getenv("VIEW_FLUSH_ON_SHUTDOWN", "true").lower() == "true"
+
+    # Trending sort: weight of a view halves every TRENDING_HALF_LIFE_HOURS.
+    # Hourly view buckets are kept for TRENDING_BUCKET_RETENTION_DAYS.
+    TRENDING_HALF_LIFE_HOURS: float = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+    TRENDING_BUCKET_RETENTION_DAYS: int = int(os.getenv("TRENDING_BUCKET_RETENTION_DAYS", "30"))
+
+    # How long a test submission's Idempotency-Key is remembered
+    IDEMPOTENCY_KEY_TTL_HOURS: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+    # Background recalculation of article importance scores; 0 disables it
+    IMPORTANCE_INTERVAL_MINUTES: int = int(os.getenv("IMPORTANCE_INTERVAL_MINUTES", "60"))
+
+    # Per-request SQL statement counting (app/core/query_stats.py). Requests
+    # over these limits are logged; a statement run N_PLUS_ONE_THRESHOLD
+    # times in one request is reported as a possible N+1 loop.
+    QUERY_STATS_ENABLED: bool = os.getenv("QUERY_STATS_ENABLED", "true").lower() == "true"
+    SERVER_TIMING_HEADER: bool = os.getenv("SERVER_TIMING_HEADER", "true").lower() == "true"
+    QUERY_COUNT_WARN_THRESHOLD: int = int(os.getenv("QUERY_COUNT_WARN_THRESHOLD", "15"))
+    QUERY_TIME_WARN_MS: int = int(os.getenv("QUERY_TIME_WARN_MS", "500"))
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+    # Cache-Control for public article responses (seconds)
+    HTTP_CACHE_MAX_AGE: int = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+    HTTP_CACHE_STALE_WHILE_REVALIDATE: int = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", "300"))
+
+    # Response compression: brotli when the client accepts it, gzip otherwise.
+    # Bodies below the threshold are sent as is.
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", "4"))
+
 settings = Settings()
\ No newline at end of file
@@ -1,10 +1,57 @@
+from pathlib import Path
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import PoolMetrics, timed_pool_class, register_metrics
+from app.core import query_stats
 
-engine = create_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+psycopg://"))
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+DATABASE_URL = settings.DATABASE_URL.replace("postgresql://", "postgresql+psycopg://")
+
+def pool_size_per_engine() -> int:
+    """Pool size for one engine in one worker process"""
+    if settings.DB_POOL_SIZE > 0:
+        return settings.DB_POOL_SIZE
+    # Every worker holds two engines (sync for admin, async for bot/articles)
+    per_engine = settings.DB_MAX_CONNECTIONS // max(settings.WEB_CONCURRENCY, 1) // 2
+    return max(per_engine - settings.DB_MAX_OVERFLOW, 1)
+
+def _engine_options(pool_class, metrics: PoolMetrics) -> dict:
+    return {
+        "poolclass": timed_pool_class(pool_class, metrics),
+        "pool_size": pool_size_per_engine(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"},
+    }
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+register_metrics("db_pool_sync", sync_pool_metrics.snapshot)
+register_metrics("db_pool_async", async_pool_metrics.snapshot)
+
+engine = create_engine(DATABASE_URL, **_engine_options(QueuePool, sync_pool_metrics))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine for the async routes (bot, public articles); psycopg3 picks its
+# async driver automatically when used through create_async_engine.
+async_engine = create_async_engine(DATABASE_URL, **_engine_options(AsyncAdaptedQueuePool, async_pool_metrics))
+if settings.QUERY_STATS_ENABLED:
+    query_stats.instrument(engine)
+    query_stats.instrument(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -14,5 +61,20 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Bring the schema up to date (alembic upgrade head); used by the scripts.
+
+    The app itself never runs DDL: deploy with `alembic upgrade head` first.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(str(ALEMBIC_INI)), "head")
+
+async def close_db():
+    await async_engine.dispose()
+    engine.dispose()
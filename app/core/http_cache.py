@@ -0,0 +1,63 @@
+"""
+HTTP conditional GET helpers: weak ETags, If-None-Match / If-Modified-Since
+evaluation and Cache-Control headers for public, cacheable responses.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """True when the client's cached copy is still current (RFC 9110 13.2.2)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/"x" and "x" match each other
+        opaque = etag.removeprefix("W/")
+        return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def set_cache_headers(response: Response, etag: str, last_modified: Optional[datetime] = None):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = (
+        f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, "
+        f"stale-while-revalidate={settings.HTTP_CACHE_STALE_WHILE_REVALIDATE}"
+    )
+    if last_modified is not None:
+        response.headers["Last-Modified"] = _http_date(last_modified)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, last_modified)
+    return response
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+from sqlalchemy import exc
+
+# name -> zero-arg callable returning a JSON-serializable dict
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, collector: Callable[[], dict]):
+    """Register a metrics collector exposed through /admin/metrics"""
+    _collectors[name] = collector
+
+
+def collect_metrics() -> dict:
+    return {name: collector() for name, collector in _collectors.items()}
+
+
+class PoolMetrics:
+    """Checkout wait time and saturation for one connection pool"""
+
+    def __init__(self, name: str, window: int = 1000):
+        self.name = name
+        self.pool = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_checked_out = 0
+        self._recent_waits = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, pool, wait: float, timed_out: bool = False):
+        with self._lock:
+            self.pool = pool
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self._recent_waits.append(wait)
+            self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            pool = self.pool
+            data = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+                "wait_p95_ms": round(recent[int(len(recent) * 0.95) - 1] * 1000, 3) if recent else 0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "peak_checked_out": self.peak_checked_out,
+            }
+
+        if pool is not None:
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            data.update({
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": checked_out,
+                "overflow": pool.overflow(),
+                "saturation": round(checked_out / capacity, 3) if capacity else 0,
+                "peak_saturation": round(data["peak_checked_out"] / capacity, 3) if capacity else 0,
+            })
+        return data
+
+
+def timed_pool_class(pool_class, metrics: PoolMetrics):
+    """Subclass a SQLAlchemy queue pool so every checkout records its wait time"""
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                metrics.observe(self, time.perf_counter() - started, timed_out=True)
+                raise
+            metrics.observe(self, time.perf_counter() - started)
+            return connection
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
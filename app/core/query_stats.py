@@ -0,0 +1,192 @@
+"""
+Per-request SQL statement counts and database time.
+
+SQLAlchemy cursor events add every statement to the QueryStats of the
+current request (a contextvar set by QueryStatsMiddleware, inherited by the
+threadpool that runs sync routes). The middleware reports the totals in a
+`Server-Timing: db;dur=...;desc="N queries"` header and logs requests that
+run too many statements, spend too long in the database, or repeat one
+statement often enough to look like an N+1 loop.
+
+In tests, assert_max_queries() fails when a request (or the code inside the
+block) runs more statements than allowed:
+
+    with assert_max_queries(3):
+        client.get("/bot/user/123/lessons")
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Statements executed while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float):
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> List[tuple]:
+        """(statement, times) for statements executed at least `threshold` times"""
+        with self._lock:
+            return [(sql, times) for sql, times in self.statements.most_common() if times >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} {"query" if self.count == 1 else "queries"}"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Called with (label, stats) when a request finishes; used by assert_max_queries
+_observers: List[Callable[[str, QueryStats], None]] = []
+
+
+class QueryStatsSummary:
+    """Process-wide counts of flagged requests, exposed through /admin/metrics"""
+
+    def __init__(self):
+        self.requests = 0
+        self.too_many_queries = 0
+        self.slow_db = 0
+        self.repeated_statements = 0
+        self.max_queries = 0
+        self._lock = threading.Lock()
+
+    def observe(self, stats: QueryStats, too_many: bool, slow: bool, repeated: bool):
+        with self._lock:
+            self.requests += 1
+            self.too_many_queries += int(too_many)
+            self.slow_db += int(slow)
+            self.repeated_statements += int(repeated)
+            self.max_queries = max(self.max_queries, stats.count)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "too_many_queries": self.too_many_queries,
+                "slow_db": self.slow_db,
+                "repeated_statements": self.repeated_statements,
+                "max_queries": self.max_queries,
+            }
+
+
+summary = QueryStatsSummary()
+register_metrics("query_stats", summary.snapshot)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None and conn.info.get("query_started"):
+        stats.record(statement, time.perf_counter() - conn.info["query_started"].pop())
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument(engine):
+    """Count the statements run through `engine` (an Engine or AsyncEngine.sync_engine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def report(label: str, stats: QueryStats):
+    """Log what stands out about a finished request"""
+    too_many = stats.count > settings.QUERY_COUNT_WARN_THRESHOLD
+    slow = stats.duration * 1000 > settings.QUERY_TIME_WARN_MS
+    repeated = stats.repeated(settings.N_PLUS_ONE_THRESHOLD)
+
+    if too_many or slow:
+        logger.warning(f"{label}: {stats.count} queries, {stats.duration * 1000:.1f}ms in the database")
+    for statement, times in repeated:
+        logger.warning(f"{label}: possible N+1, statement executed {times} times: {' '.join(statement.split())[:300]}")
+
+    summary.observe(stats, too_many, slow, bool(repeated))
+    for observer in list(_observers):
+        observer(label, stats)
+
+
+class QueryStatsMiddleware:
+    """Collects QueryStats for every HTTP request and adds the Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING_HEADER:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            report(f"{scope['method']} {scope['path']}", stats)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Fail if any request finished inside the block, or the block itself, ran more than `limit` statements"""
+    offenders = []
+
+    def observe(label: str, stats: QueryStats):
+        if stats.count > limit:
+            offenders.append((label, stats))
+
+    stats = QueryStats()
+    token = _current.set(stats)
+    _observers.append(observe)
+    try:
+        yield stats
+    finally:
+        _observers.remove(observe)
+        _current.reset(token)
+
+    if stats.count > limit:
+        offenders.append(("block", stats))
+    if offenders:
+        details = "\n".join(
+            f"{label}: {found.count} queries\n    " + "\n    ".join(
+                f"{times}x {' '.join(sql.split())[:200]}" for sql, times in found.statements.most_common()
+            )
+            for label, found in offenders
+        )
+        raise AssertionError(f"More than {limit} queries:\n{details}")
@@ -0,0 +1,7 @@
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+# Periodic background jobs of the API process. Jobs are registered by the
+# services that own them and run on the application's event loop; main.py
+# starts the scheduler on startup and shuts it down before the engines are
+# disposed.
+scheduler = AsyncIOScheduler(job_defaults={"coalesce": True, "max_instances": 1})
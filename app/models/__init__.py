@@ -1,15 +1,18 @@
 from .user import UserDB, User
 from .lesson import LessonDB, Lesson
 from .test_question import TestQuestionDB, TestQuestion
-from .test_result import UserTestResultDB, UserTestResult, UserAnswer
+from .test_result import UserTestResultDB, UserTestResult, UserAnswer, TestSubmissionKeyDB
 from .access import UserLessonAccessDB, UserLessonAccess
-from .article import ArticleDB, Article, CategoryDB, Category, CategoryCreate, CategoryUpdate
+from .article import ArticleDB, Article, CategoryDB, Category, CategoryCreate, CategoryUpdate, CatalogVersionDB, ArticleViewBucketDB
+from .rollup import DailyLessonStatsDB, DailyRegistrationsDB
 
 __all__ = [
     "UserDB", "User",
     "LessonDB", "Lesson", 
     "TestQuestionDB", "TestQuestion",
-    "UserTestResultDB", "UserTestResult", "UserAnswer",
+    "UserTestResultDB", "UserTestResult", "UserAnswer", "TestSubmissionKeyDB",
     "UserLessonAccessDB", "UserLessonAccess",
-    "ArticleDB", "Article", "CategoryDB", "Category", "CategoryCreate", "CategoryUpdate"
+    "ArticleDB", "Article", "CategoryDB", "Category", "CategoryCreate", "CategoryUpdate", "CatalogVersionDB",
+    "ArticleViewBucketDB",
+    "DailyLessonStatsDB", "DailyRegistrationsDB"
 ]
\ No newline at end of file
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -10,11 +10,11 @@ from app.core.database import Base
 class UserLessonAccessDB(Base):
     __tablename__ = "user_lesson_access"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     lesson_id = Column(UUID(as_uuid=True), ForeignKey("lessons.id"), index=True)
-    is_unlocked = Column(Boolean, default=True, index=True)
-    unlocked_at = Column(DateTime, default=datetime.utcnow, index=True)
+    is_unlocked = Column(Boolean, default=True)
+    unlocked_at = Column(DateTime, default=datetime.utcnow)
     amount = Column(Integer, nullable=False)
     paid_at = Column(DateTime, default=datetime.utcnow)
     notes = Column(Text)
@@ -22,6 +22,13 @@ class UserLessonAccessDB(Base):
     user = relationship("UserDB")
     lesson = relationship("LessonDB")
 
+    __table_args__ = (
+        # Access checks and a user's purchases
+        Index("ix_user_lesson_access_user_lesson", "user_id", "lesson_id"),
+        # Latest purchases first (dashboard, access list)
+        Index("ix_user_lesson_access_paid_at", "paid_at"),
+    )
+
 
 class UserLessonAccess(BaseModel):
     id: str = Field(..., index=True)
@@ -1,16 +1,24 @@
 from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, ForeignKey, Text, ARRAY
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, BigInteger, Float, DateTime, Boolean, ForeignKey, Text, ARRAY, Computed, Index, func, literal_column
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 import uuid
 from app.core.database import Base
 
+# What NULLs of the nullable listing sort columns sort as: below every value,
+# so they come last in the descending listing
+SORT_NULLS = {
+    "published_at": literal_column("'-infinity'::timestamp"),
+    "view_count": literal_column("-1"),
+    "importance_score": literal_column("'-Infinity'::float8"),
+}
+
 class CategoryDB(Base):
     __tablename__ = "categories"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(100), nullable=False)
     slug = Column(String(100), unique=True, index=True, nullable=False)
     description = Column(Text, nullable=True)
@@ -20,14 +28,14 @@ class CategoryDB(Base):
 class ArticleDB(Base):
     __tablename__ = "articles"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String(255), nullable=False)
     slug = Column(String(255), unique=True, index=True, nullable=False)
     content = Column(Text, nullable=False)
     excerpt = Column(Text, nullable=True)
     cover_image = Column(String, nullable=True)
     
-    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"))
+    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), index=True)
     category = relationship("CategoryDB", back_populates="articles")
     
     # Store tags as a list of strings (PostgreSQL ARRAY)
@@ -38,10 +46,63 @@ class ArticleDB(Base):
     
     view_count = Column(Integer, default=0)
     importance_score = Column(Float, default=0.0)
+    # Exponentially decayed view count in log space, see app/services/trending.py
+    trending_score = Column(Float, nullable=False, default=0.0, server_default="0")
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Full-text search document, maintained by PostgreSQL. The 'simple'
+    # configuration does no stemming, which suits the mixed Uzbek/Russian
+    # content; weights rank title over excerpt over body.
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(excerpt, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(content, '')), 'C')",
+            persisted=True
+        )
+    ))
+
+    __table_args__ = (
+        Index("ix_articles_search_vector", "search_vector", postgresql_using="gin"),
+        # Keyset pagination of the public listing, one per sort order
+        Index(
+            "ix_articles_published_latest", func.coalesce(published_at, SORT_NULLS["published_at"]), "id",
+            postgresql_where=is_published
+        ),
+        Index(
+            "ix_articles_published_popular", func.coalesce(view_count, SORT_NULLS["view_count"]), "id",
+            postgresql_where=is_published
+        ),
+        Index(
+            "ix_articles_published_important", func.coalesce(importance_score, SORT_NULLS["importance_score"]), "id",
+            postgresql_where=is_published
+        ),
+        Index("ix_articles_published_trending", "trending_score", "id", postgresql_where=is_published),
+    )
+
+class ArticleViewBucketDB(Base):
+    """Article views per hour, appended by the view counter flush"""
+    __tablename__ = "article_view_buckets"
+
+    article_id = Column(UUID(as_uuid=True), ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    hour = Column(DateTime, primary_key=True, index=True)
+    views = Column(Integer, nullable=False, default=0)
+
+class CatalogVersionDB(Base):
+    """Single-row counter bumped by every admin change to articles or categories.
+
+    Public article responses derive their ETags from it, so all workers agree
+    on when the catalog changed. Buffered view counts do not bump it.
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True, default=1)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
 # Pydantic Models
 
 class CategoryBase(BaseModel):
@@ -94,6 +155,8 @@ class Article(ArticleBase):
     created_at: datetime
     updated_at: datetime
     category: Optional[Category] = None
+    # Highlighted snippet, only set for search results
+    headline: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -102,10 +165,12 @@ class Article(ArticleBase):
         }
 
 class ArticlePaginationMeta(BaseModel):
-    total: int
-    page: int
+    total: Optional[int] = None        # None when requested with with_total=false
+    page: Optional[int] = None         # None in cursor mode
     limit: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # pass back as `cursor` for the next page
+    has_more: bool = False
 
 class ArticleListResponse(BaseModel):
     data: List[Article]
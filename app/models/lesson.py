@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel, Field, HttpUrl
-from sqlalchemy import Column, String, Text, Boolean, DateTime
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -10,17 +10,22 @@ from app.core.database import Base
 class LessonDB(Base):
     __tablename__ = "lessons"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    title = Column(String(200), nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
     video_url = Column(String(500), nullable=False)
     pdf_url = Column(String(500), nullable=False)
     ppt_url = Column(String(500), nullable=False)
-    is_published = Column(Boolean, default=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    is_published = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
     
     questions = relationship("TestQuestionDB", back_populates="lesson")
 
+    __table_args__ = (
+        # Bot lesson catalog: published lessons, oldest first
+        Index("ix_lessons_published_created_at", "created_at", "id", postgresql_where=is_published),
+    )
+
 
 class Lesson(BaseModel):
     id: str = Field(..., index=True)
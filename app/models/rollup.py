@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, BigInteger, Date, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+
+class DailyLessonStatsDB(Base):
+    """Per-lesson, per-day purchase and test counters kept up to date on write"""
+    __tablename__ = "daily_lesson_stats"
+
+    day = Column(Date, primary_key=True)
+    lesson_id = Column(UUID(as_uuid=True), ForeignKey("lessons.id"), primary_key=True)
+    purchases = Column(Integer, nullable=False, default=0)
+    revenue = Column(BigInteger, nullable=False, default=0)
+    test_completions = Column(Integer, nullable=False, default=0)
+
+
+class DailyRegistrationsDB(Base):
+    """Number of users registered per day"""
+    __tablename__ = "daily_registrations"
+
+    day = Column(Date, primary_key=True)
+    registrations = Column(Integer, nullable=False, default=0)
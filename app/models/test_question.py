@@ -10,7 +10,7 @@ from app.core.database import Base
 class TestQuestionDB(Base):
     __tablename__ = "test_questions"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     lesson_id = Column(UUID(as_uuid=True), ForeignKey("lessons.id"), index=True)
     question_text = Column(Text, nullable=False)
     options = Column(ARRAY(String), nullable=False)
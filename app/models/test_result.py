@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List
 from pydantic import BaseModel, Field, validator
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, JSON, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -11,18 +11,44 @@ from app.core.database import Base
 class UserTestResultDB(Base):
     __tablename__ = "user_test_results"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
-    lesson_id = Column(UUID(as_uuid=True), ForeignKey("lessons.id"), index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    lesson_id = Column(UUID(as_uuid=True), ForeignKey("lessons.id"))
     score = Column(Integer, nullable=False)
     total_questions = Column(Integer, nullable=False)
     answers = Column(JSON, nullable=False)
-    started_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
     ended_at = Column(DateTime, nullable=False)
     
     user = relationship("UserDB")
     lesson = relationship("LessonDB")
 
+    __table_args__ = (
+        # One result per user and lesson; a new attempt replaces the old one.
+        # Its index also serves all lookups by user.
+        UniqueConstraint("user_id", "lesson_id", name="uq_user_test_results_user_lesson"),
+        # Lesson results (newest first) and per-lesson stats
+        Index("ix_user_test_results_lesson_ended_at", "lesson_id", "ended_at"),
+        # Latest results across all lessons (admin dashboard)
+        Index("ix_user_test_results_ended_at", "ended_at"),
+    )
+
+
+class TestSubmissionKeyDB(Base):
+    """Idempotency key of a test submission and the response it produced.
+
+    A repeated POST with the same key returns `response` instead of grading
+    the attempt again. Rows expire after IDEMPOTENCY_KEY_TTL_HOURS.
+    """
+    __tablename__ = "test_submission_keys"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    lesson_id = Column(UUID(as_uuid=True), nullable=False)
+    request_hash = Column(String(64), nullable=True)  # SHA-256 of the submitted answers
+    response = Column(JSON, nullable=True)  # NULL while the first request is in flight
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
 
 class UserAnswer(BaseModel):
     question: str = Field(..., min_length=1, max_length=1000)
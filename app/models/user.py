@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel, Field, validator
-from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Boolean
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Boolean, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 import re
@@ -10,11 +10,24 @@ from app.core.database import Base
 class UserDB(Base):
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     full_name = Column(String(100), nullable=False)
     telegram_id = Column(BigInteger, unique=True, index=True, nullable=False)
-    phone_number = Column(String(20), index=True, nullable=False)
-    joined_at = Column(DateTime, default=datetime.utcnow, index=True)
+    phone_number = Column(String(20), nullable=False)
+    joined_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Keyset pagination of the admin user list (newest first)
+        Index("ix_users_joined_at_id", "joined_at", "id"),
+        # Prefix search; text_pattern_ops lets LIKE 'abc%' use the btree.
+        # It also serves equality lookups by phone number.
+        Index("ix_users_phone_number_prefix", "phone_number", postgresql_ops={"phone_number": "text_pattern_ops"}),
+        Index(
+            "ix_users_full_name_lower_prefix",
+            func.lower(full_name).label("full_name_lower"),
+            postgresql_ops={"full_name_lower": "text_pattern_ops"}
+        ),
+    )
 
 
 class User(BaseModel):
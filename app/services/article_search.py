@@ -0,0 +1,42 @@
+"""
+Full-text search over articles.
+
+Queries go through websearch_to_tsquery, so user input is never a syntax
+error: quoted phrases, `or` and `-word` work as on a web search engine.
+Matching uses the GIN-indexed ArticleDB.search_vector column.
+"""
+from sqlalchemy import func, select
+
+from app.models.article import ArticleDB
+
+SEARCH_CONFIG = "simple"
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+def ts_query(term: str):
+    return func.websearch_to_tsquery(SEARCH_CONFIG, term)
+
+
+def matches(term: str):
+    """WHERE clause for articles matching the search term"""
+    return ArticleDB.search_vector.op("@@")(ts_query(term))
+
+
+def rank(term: str):
+    """Relevance of an article for the term; higher is better"""
+    return func.ts_rank(ArticleDB.search_vector, ts_query(term))
+
+
+def headlines(term: str, article_ids):
+    """Statement returning (id, highlighted snippet) for the given articles.
+
+    ts_headline re-parses the whole body, so it is only run for the rows of
+    the page being returned, never for every match.
+    """
+    snippet = func.ts_headline(
+        SEARCH_CONFIG,
+        func.coalesce(ArticleDB.excerpt, "") + " " + ArticleDB.content,
+        ts_query(term),
+        HEADLINE_OPTIONS
+    )
+    return select(ArticleDB.id, snippet).where(ArticleDB.id.in_(article_ids))
@@ -0,0 +1,428 @@
+"""
+Shared cache for data that every worker process should see the same way.
+
+`shared_cache` stores JSON values (serialized with orjson) under namespaced
+keys with a TTL. The backend is chosen by REDIS_URL:
+
+- empty or ``memory://``: an in-process dict, for a single worker and tests
+- ``redis://...``: Redis, shared by all workers
+- ``fakeredis://``: the fakeredis package (not in requirements.txt), to
+  exercise the Redis code path in tests without a server
+
+Invalidations are broadcast over pub/sub, so per-process caches (the
+question and user caches) can subscribe with on_invalidate() and drop their
+entries in every worker. Messages missed while Redis is unreachable are
+not replayed; the TTLs of those caches bound the staleness.
+
+get_or_load() runs the loader once per key at a time: concurrent callers in
+the process wait for the same load, and with Redis a short lock key makes
+other workers wait for the value instead of hitting the database as well.
+Every key has a version that invalidate() bumps in the backend. A load
+stores its result only if the version is still the one it read before
+calling the loader, so a load that raced an invalidation can't put the old
+value back.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import anyio.from_thread
+import orjson
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "invalidate"
+
+_MISSING = object()
+
+
+class _LoadCancelled(Exception):
+    """Given to the callers waiting on a load whose own caller was cancelled"""
+
+
+class MemoryBackend:
+    """Bounded in-process key/value store with per-key expiry"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Versions are kept apart from the LRU so that evicting one can't
+        # turn it back into an older value
+        self._versions: Dict[str, int] = {}
+        self._subscribers: Dict[str, List[Callable[[bytes], None]]] = {}
+
+    def _live(self, key: str) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._live(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Set the key only if it does not exist; True if it was set"""
+        if self._live(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._versions[key] = self._versions.get(key, 0) + 1
+        return self._versions[key]
+
+    async def set_if_version(self, key: str, value: bytes, ttl: float, version_key: str, version: int) -> bool:
+        """Set the key only while `version_key` is still at `version`; True if it was set"""
+        if self._versions.get(version_key, 0) != version:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def publish(self, channel: str, message: bytes):
+        for handler in self._subscribers.get(channel, []):
+            handler(message)
+
+    async def subscribe(self, channel: str, handler: Callable[[bytes], None]):
+        self._subscribers.setdefault(channel, []).append(handler)
+
+    async def close(self):
+        self._subscribers.clear()
+
+
+class RedisBackend:
+    """Backend on a redis.asyncio client (or a compatible one, e.g. fakeredis)"""
+
+    name = "redis"
+
+    def __init__(self, client):
+        self.client = client
+        self._listeners: List[asyncio.Task] = []
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(await self.client.set(key, value, px=int(ttl * 1000), nx=True))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+    async def version(self, key: str) -> int:
+        return int(await self.client.get(key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+    async def set_if_version(self, key: str, value: bytes, ttl: float, version_key: str, version: int) -> bool:
+        from redis.exceptions import WatchError
+
+        # WATCH makes the SET fail if an invalidation bumps the version in between
+        async with self.client.pipeline(transaction=True) as pipe:
+            await pipe.watch(version_key)
+            if int(await pipe.get(version_key) or 0) != version:
+                return False
+            pipe.multi()
+            pipe.set(key, value, px=int(ttl * 1000))
+            try:
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def publish(self, channel: str, message: bytes):
+        await self.client.publish(channel, message)
+
+    async def subscribe(self, channel: str, handler: Callable[[bytes], None]):
+        self._listeners.append(asyncio.create_task(self._listen(channel, handler)))
+
+    async def _listen(self, channel: str, handler: Callable[[bytes], None]):
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        handler(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener on '{channel}' failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self):
+        for task in self._listeners:
+            task.cancel()
+        await asyncio.gather(*self._listeners, return_exceptions=True)
+        self._listeners.clear()
+        await self.client.aclose()
+
+
+def create_backend(url: str):
+    if not url or url.startswith("memory://"):
+        return MemoryBackend(max_entries=settings.CACHE_MEMORY_MAX_ENTRIES)
+    if url.startswith("fakeredis://"):
+        import fakeredis.aioredis
+        return RedisBackend(fakeredis.aioredis.FakeRedis())
+
+    import redis.asyncio
+    return RedisBackend(redis.asyncio.from_url(
+        url,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        health_check_interval=30
+    ))
+
+
+class SharedCache:
+    """Namespaced JSON cache with pub/sub invalidation and single-flight loads"""
+
+    def __init__(self, backend, prefix: str = "namoz", lock_ttl: float = 5.0):
+        self.backend = backend
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+        self.node_id = uuid.uuid4().hex
+        self._listeners: Dict[str, List[Callable[[str], None]]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.lock_waits = 0
+        self.stale_loads = 0
+        self.errors = 0
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+
+    def _key(self, namespace: str, key) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    @staticmethod
+    def _version_key(full_key: str) -> str:
+        return f"{full_key}:version"
+
+    async def start(self):
+        await self.backend.subscribe(f"{self.prefix}:{INVALIDATION_CHANNEL}", self._on_message)
+
+    async def close(self):
+        await self.backend.close()
+
+    async def _get(self, full_key: str):
+        try:
+            raw = await self.backend.get(full_key)
+        except Exception as e:
+            # An unreachable cache degrades to a miss, never to an error
+            self.errors += 1
+            logger.warning(f"Cache get failed for {full_key}: {e}")
+            return _MISSING
+        return _MISSING if raw is None else orjson.loads(raw)
+
+    async def _set(self, full_key: str, value, ttl: float):
+        try:
+            await self.backend.set(full_key, orjson.dumps(value), ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache set failed for {full_key}: {e}")
+
+    async def _set_if_version(self, full_key: str, value, ttl: float, version: int):
+        try:
+            stored = await self.backend.set_if_version(
+                full_key, orjson.dumps(value), ttl, self._version_key(full_key), version
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache set failed for {full_key}: {e}")
+            return
+        if not stored:
+            # Invalidated while loading: the value may predate the change
+            self.stale_loads += 1
+
+    async def get(self, namespace: str, key, default=None):
+        value = await self._get(self._key(namespace, key))
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    async def set(self, namespace: str, key, value, ttl: float):
+        await self._set(self._key(namespace, key), value, ttl)
+
+    async def get_or_load(self, namespace: str, key, loader: Callable[[], Awaitable[Any]], ttl: float):
+        """Cached value, or the result of `loader()` stored for `ttl` seconds"""
+        full_key = self._key(namespace, key)
+        value = await self._get(full_key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        coalesced = False
+        while (inflight := self._inflight.get(full_key)) is not None:
+            if not coalesced:
+                coalesced = True
+                self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except _LoadCancelled:
+                continue  # the caller running the load was cancelled: take over
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            value = await self._load(full_key, loader, ttl)
+        except asyncio.CancelledError:
+            # Only this caller was cancelled, not the callers waiting on it
+            future.set_exception(_LoadCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            if self._inflight.get(full_key) is future:
+                del self._inflight[full_key]
+        return value
+
+    async def _load(self, full_key: str, loader, ttl: float):
+        lock_key = f"{full_key}:lock"
+        try:
+            locked = await self.backend.add(lock_key, self.node_id.encode(), self.lock_ttl)
+        except Exception:
+            locked = None  # no cache to coordinate through, just load
+
+        if locked is False:
+            # Another worker is loading this key: wait for its result a little
+            self.lock_waits += 1
+            deadline = time.monotonic() + self.lock_ttl
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                value = await self._get(full_key)
+                if value is not _MISSING:
+                    return value
+
+        try:
+            version = await self.backend.version(self._version_key(full_key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache version read failed for {full_key}: {e}")
+            version = None  # load without storing the result
+
+        try:
+            self.loads += 1
+            value = await loader()
+            if version is not None:
+                await self._set_if_version(full_key, value, ttl, version)
+            return value
+        finally:
+            if locked:
+                try:
+                    await self.backend.delete(lock_key)
+                except Exception:
+                    pass  # expires after lock_ttl
+
+    def on_invalidate(self, namespace: str, listener: Callable[[str], None]):
+        """Call `listener(key)` whenever a key of the namespace is invalidated in any worker"""
+        self._listeners.setdefault(namespace, []).append(listener)
+
+    def _notify(self, namespace: str, key: str):
+        # Callers that arrive from now on start a new load instead of
+        # waiting for one that may have read the old data
+        self._inflight.pop(self._key(namespace, key), None)
+        for listener in self._listeners.get(namespace, []):
+            try:
+                listener(key)
+            except Exception as e:
+                logger.error(f"Cache invalidation listener for '{namespace}' failed: {e}")
+
+    def _on_message(self, message: bytes):
+        try:
+            node_id, namespace, key = orjson.loads(message)
+        except (orjson.JSONDecodeError, ValueError, TypeError):
+            logger.warning(f"Ignoring malformed cache invalidation message: {message!r}")
+            return
+        if node_id != self.node_id:
+            self.invalidations_received += 1
+            self._notify(namespace, key)
+
+    async def invalidate(self, namespace: str, key):
+        """Drop the key here and in every other worker"""
+        key = str(key)
+        self.invalidations_sent += 1
+        self._notify(namespace, key)
+        full_key = self._key(namespace, key)
+        try:
+            await self.backend.incr(self._version_key(full_key))
+            # Dropping the lock too lets the next load start at once instead
+            # of waiting for one that will not store its result
+            await self.backend.delete(full_key, f"{full_key}:lock")
+            await self.backend.publish(
+                f"{self.prefix}:{INVALIDATION_CHANNEL}",
+                orjson.dumps([self.node_id, namespace, key])
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache invalidation of {namespace}:{key} was not broadcast: {e}")
+
+    def invalidate_sync(self, namespace: str, key):
+        """invalidate() for sync route handlers, which run in worker threads"""
+        try:
+            anyio.from_thread.run(self.invalidate, namespace, key)
+        except RuntimeError:
+            # Not in a request thread (e.g. a script): only this process is notified
+            self._notify(namespace, str(key))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "lock_waits": self.lock_waits,
+            "stale_loads": self.stale_loads,
+            "errors": self.errors,
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received,
+            "inflight": len(self._inflight),
+        }
+
+
+shared_cache = SharedCache(create_backend(settings.REDIS_URL), prefix=settings.CACHE_PREFIX)
+register_metrics("shared_cache", shared_cache.stats)
@@ -0,0 +1,35 @@
+"""
+Catalog version behind the public article ETags.
+
+Like the rollup helpers, bump() returns a statement: execute it in the same
+transaction as the admin write it describes.
+"""
+from datetime import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.article import CatalogVersionDB
+
+
+def bump():
+    """Articles or categories changed"""
+    table = CatalogVersionDB.__table__
+    stmt = insert(table).values(id=1, version=1, updated_at=datetime.utcnow())
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at}
+    )
+
+
+def current():
+    """Statement selecting (version, updated_at); no row until the first bump"""
+    return select(CatalogVersionDB.version, CatalogVersionDB.updated_at).where(CatalogVersionDB.id == 1)
+
+
+def current_version():
+    """Scalar subquery of the version, for use next to other columns"""
+    return func.coalesce(
+        select(CatalogVersionDB.version).where(CatalogVersionDB.id == 1).scalar_subquery(),
+        0
+    )
@@ -0,0 +1,101 @@
+"""
+Idempotency keys for test submissions.
+
+The first request with a key claims it by inserting a row; the row is
+committed together with the test result and the response it produced. A
+concurrent duplicate blocks on that insert until the first transaction
+ends, then finds the stored response. Expired keys can be claimed again.
+A key reused with different answers or for another lesson is rejected.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.scheduler import scheduler
+from app.models.test_result import TestSubmissionKeyDB
+
+MAX_KEY_LENGTH = 100
+
+
+def _cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def validate_key(key: str) -> str:
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+    return key
+
+
+def request_hash(answers: list) -> str:
+    """Fingerprint of the submitted answers, to tell a repeat from a different request"""
+    body = json.dumps(answers, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def claim(user_id, key: str, lesson_id, fingerprint: str):
+    """Statement returning the key if this request claimed it, nothing if it was already taken"""
+    table = TestSubmissionKeyDB.__table__
+    stmt = insert(table).values(
+        user_id=user_id,
+        key=key,
+        lesson_id=lesson_id,
+        request_hash=fingerprint,
+        response=None,
+        created_at=datetime.utcnow()
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.key],
+        set_={
+            "lesson_id": stmt.excluded.lesson_id,
+            "request_hash": stmt.excluded.request_hash,
+            "response": None,
+            "created_at": stmt.excluded.created_at,
+        },
+        where=table.c.created_at < _cutoff()
+    ).returning(table.c.key)
+
+
+def stored(user_id, key: str):
+    """Statement selecting (lesson_id, request_hash, response) of a claimed key"""
+    return select(
+        TestSubmissionKeyDB.lesson_id, TestSubmissionKeyDB.request_hash, TestSubmissionKeyDB.response
+    ).where(
+        TestSubmissionKeyDB.user_id == user_id,
+        TestSubmissionKeyDB.key == key
+    )
+
+
+def replay(row, lesson_id, fingerprint: str) -> dict:
+    """Response of an earlier request with the same key"""
+    if row is None or row.response is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    if row.lesson_id != lesson_id:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for another lesson")
+    # Keys claimed before request_hash existed have none; they expire within a day
+    if row.request_hash is not None and row.request_hash != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with different answers")
+    return row.response
+
+
+def save_response(user_id, key: str, response: dict):
+    return update(TestSubmissionKeyDB).where(
+        TestSubmissionKeyDB.user_id == user_id,
+        TestSubmissionKeyDB.key == key
+    ).values(response=response)
+
+
+async def drop_expired_keys():
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(TestSubmissionKeyDB).where(TestSubmissionKeyDB.created_at < _cutoff()))
+        await db.commit()
+
+
+scheduler.add_job(drop_expired_keys, "interval", hours=1, id="drop_expired_submission_keys")
@@ -0,0 +1,144 @@
+"""
+Article importance score, recalculated in the database.
+
+    score = log10(view_count + 1) * 10 + 100 / max(1, days since published)
+
+One UPDATE computes the score for every published article and writes only
+rows whose score actually changed. The job runs on the scheduler every
+IMPORTANCE_INTERVAL_MINUTES; an advisory lock keeps concurrent runs (other
+workers, the admin endpoint) from doing the same work twice.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update, select, func, cast, Integer, Float
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import register_metrics
+from app.core.scheduler import scheduler
+from app.models.article import ArticleDB
+from app.services import catalog_version
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock key, arbitrary but fixed
+LOCK_KEY = 0x1A7C0_1
+SKIPPED = -1
+
+
+def score_update():
+    now = func.timezone("utc", func.now())
+    days_since = func.greatest(
+        1,
+        cast(func.floor(func.extract("epoch", now - ArticleDB.published_at) / 86400), Integer)
+    )
+    # Never published articles are treated as published today
+    days_since = func.coalesce(days_since, 1)
+    # double precision throughout, so unchanged scores compare equal
+    views = cast(func.coalesce(ArticleDB.view_count, 0) + 1, Float)
+    score = func.log(views) * 10 + 100 / cast(days_since, Float)
+
+    return (
+        update(ArticleDB)
+        .where(
+            ArticleDB.is_published == True,
+            ArticleDB.importance_score.is_distinct_from(score)
+        )
+        # A score change is not an edit: keep updated_at as it was
+        .values(importance_score=score, updated_at=ArticleDB.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _try_lock():
+    return select(func.pg_try_advisory_xact_lock(LOCK_KEY))
+
+
+class ImportanceRuns:
+    """Stats of the recalculation runs of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration_ms = 0.0
+        self.last_rows_changed = 0
+
+    def record(self, started: float, rows_changed: int):
+        with self._lock:
+            if rows_changed == SKIPPED:
+                self.skipped += 1
+                return
+            self.runs += 1
+            self.last_run_at = datetime.utcnow()
+            self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.last_rows_changed = rows_changed
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "skipped": self.skipped,
+                "failures": self.failures,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "last_duration_ms": self.last_duration_ms,
+                "last_rows_changed": self.last_rows_changed,
+            }
+
+
+runs = ImportanceRuns()
+register_metrics("importance", runs.stats)
+
+
+def recalculate(db: Session) -> int:
+    """Recalculate on a sync session; returns rows changed, or SKIPPED if another run holds the lock"""
+    started = time.perf_counter()
+    if not db.scalar(_try_lock()):
+        db.rollback()
+        runs.record(started, SKIPPED)
+        return SKIPPED
+
+    rows_changed = db.execute(score_update()).rowcount
+    if rows_changed:
+        db.execute(catalog_version.bump())
+    db.commit()
+    runs.record(started, rows_changed)
+    return rows_changed
+
+
+async def scheduled_recalculate():
+    started = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as db:
+            if not await db.scalar(_try_lock()):
+                runs.record(started, SKIPPED)
+                return
+            rows_changed = (await db.execute(score_update())).rowcount
+            if rows_changed:
+                await db.execute(catalog_version.bump())
+            await db.commit()
+    except Exception:
+        runs.failed()
+        logger.exception("Scheduled importance recalculation failed")
+        return
+    runs.record(started, rows_changed)
+
+
+if settings.IMPORTANCE_INTERVAL_MINUTES > 0:
+    scheduler.add_job(
+        scheduled_recalculate,
+        "interval",
+        minutes=settings.IMPORTANCE_INTERVAL_MINUTES,
+        id="recalculate_importance"
+    )
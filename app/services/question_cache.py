@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+from app.services.cache import shared_cache
+
+
+class AnswerKeyEntry(NamedTuple):
+    question_text: str
+    options: List[str]
+    correct_option: int
+
+
+class QuestionSet(NamedTuple):
+    version: int
+    loaded_at: float
+    questions: List[dict]                  # public payload, without correct answers
+    answer_key: Dict[str, AnswerKeyEntry]  # question id (str) -> grading data
+
+
+class QuestionSetCache:
+    """
+    Per-lesson cache of parsed test questions and their answer key.
+
+    Every lesson has a version that invalidate() bumps. Admin write paths
+    invalidate through shared_cache, which calls it in every worker process.
+    Entries remember the version they were loaded at and are served only
+    while it is still current. The TTL bounds staleness when an
+    invalidation message is lost.
+    """
+
+    def __init__(self, max_lessons: int = 256, ttl: float = 300):
+        self.max_lessons = max_lessons
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, QuestionSet]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def version(self, lesson_id) -> int:
+        with self._lock:
+            return self._versions.get(str(lesson_id), 0)
+
+    def get(self, lesson_id) -> Optional[QuestionSet]:
+        key = str(lesson_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is None
+                or entry.version != self._versions.get(key, 0)
+                or time.monotonic() - entry.loaded_at > self.ttl
+            ):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, lesson_id, version: int, questions) -> QuestionSet:
+        """Build a QuestionSet from TestQuestionDB rows loaded at `version`"""
+        question_set = QuestionSet(
+            version=version,
+            loaded_at=time.monotonic(),
+            questions=[
+                {
+                    "id": str(question.id),
+                    "question_text": question.question_text,
+                    "options": list(question.options)
+                }
+                for question in questions
+            ],
+            answer_key={
+                str(question.id): AnswerKeyEntry(
+                    question.question_text,
+                    list(question.options),
+                    question.correct_option
+                )
+                for question in questions
+            }
+        )
+
+        key = str(lesson_id)
+        with self._lock:
+            # An admin edit that landed while we were loading makes this stale
+            if version == self._versions.get(key, 0):
+                self._entries[key] = question_set
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_lessons:
+                    self._entries.popitem(last=False)
+        return question_set
+
+    def invalidate(self, lesson_id):
+        key = str(lesson_id)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+                "invalidations": self.invalidations,
+            }
+
+
+question_cache = QuestionSetCache(
+    max_lessons=settings.QUESTION_CACHE_MAX_LESSONS,
+    ttl=settings.QUESTION_CACHE_TTL
+)
+register_metrics("question_cache", question_cache.stats)
+# Admin edits in any worker: shared_cache.invalidate("questions", lesson_id)
+shared_cache.on_invalidate("questions", question_cache.invalidate)
@@ -0,0 +1,176 @@
+"""
+Daily rollup counters behind the admin dashboard.
+
+test_completions counts saved test results, i.e. the latest attempt of each
+user at each lesson, on the day it was completed. A re-take replaces the
+earlier result, so its count moves from the earlier day to the new one.
+backfill() computes the same numbers from user_test_results.
+
+The helpers return SQL statements instead of executing them, so the same
+code serves the sync admin Session and the async bot AsyncSession. Execute
+them in the same transaction as the write they describe, so that the
+counters commit or roll back together with it.
+"""
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import select, update, delete, func, text, cast, literal, Date
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.access import UserLessonAccessDB
+from app.models.rollup import DailyLessonStatsDB, DailyRegistrationsDB
+from app.models.test_result import UserTestResultDB
+from app.models.user import UserDB
+
+
+def _day(at: Optional[datetime]) -> date:
+    return (at or datetime.utcnow()).date()
+
+
+def _bump_lesson(day: date, lesson_id, purchases: int = 0, revenue: int = 0, test_completions: int = 0):
+    stats = DailyLessonStatsDB.__table__
+    stmt = insert(stats).values(
+        day=day,
+        lesson_id=lesson_id,
+        purchases=purchases,
+        revenue=revenue,
+        test_completions=test_completions
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[stats.c.day, stats.c.lesson_id],
+        set_={
+            "purchases": stats.c.purchases + stmt.excluded.purchases,
+            "revenue": stats.c.revenue + stmt.excluded.revenue,
+            "test_completions": stats.c.test_completions + stmt.excluded.test_completions,
+        }
+    )
+
+
+def purchase(lesson_id, amount: int, at: Optional[datetime] = None):
+    """A user was granted access to a lesson"""
+    return _bump_lesson(_day(at), lesson_id, purchases=1, revenue=amount or 0)
+
+
+def test_completion(lesson_id, at: Optional[datetime] = None, replaced_at: Optional[datetime] = None) -> List:
+    """A test result was saved; `replaced_at` is when the result it replaced was completed"""
+    day = _day(at)
+    if replaced_at is None:
+        return [_bump_lesson(day, lesson_id, test_completions=1)]
+    if replaced_at.date() == day:
+        return []
+    return [
+        _bump_lesson(replaced_at.date(), lesson_id, test_completions=-1),
+        _bump_lesson(day, lesson_id, test_completions=1),
+    ]
+
+
+def registration(at: Optional[datetime] = None):
+    """A new user registered"""
+    registrations = DailyRegistrationsDB.__table__
+    stmt = insert(registrations).values(day=_day(at), registrations=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[registrations.c.day],
+        set_={"registrations": registrations.c.registrations + stmt.excluded.registrations}
+    )
+
+
+def user_removed(user_id) -> List:
+    """Subtract a user's purchases, test results and registration; run before deleting their rows"""
+    purchases = select(
+        cast(UserLessonAccessDB.paid_at, Date).label("day"),
+        UserLessonAccessDB.lesson_id,
+        func.count(UserLessonAccessDB.id).label("purchases"),
+        func.coalesce(func.sum(UserLessonAccessDB.amount), 0).label("revenue")
+    ).where(UserLessonAccessDB.user_id == user_id).group_by(
+        cast(UserLessonAccessDB.paid_at, Date), UserLessonAccessDB.lesson_id
+    ).subquery()
+
+    completion_day = cast(UserTestResultDB.ended_at, Date)
+    completions = select(
+        completion_day.label("day"),
+        UserTestResultDB.lesson_id,
+        func.count(UserTestResultDB.id).label("test_completions")
+    ).where(UserTestResultDB.user_id == user_id).group_by(
+        completion_day, UserTestResultDB.lesson_id
+    ).subquery()
+
+    joined = select(cast(UserDB.joined_at, Date)).where(UserDB.id == user_id).scalar_subquery()
+
+    return [
+        update(DailyLessonStatsDB).values(
+            purchases=DailyLessonStatsDB.purchases - purchases.c.purchases,
+            revenue=DailyLessonStatsDB.revenue - purchases.c.revenue
+        ).where(
+            DailyLessonStatsDB.day == purchases.c.day,
+            DailyLessonStatsDB.lesson_id == purchases.c.lesson_id
+        ),
+        update(DailyLessonStatsDB).values(
+            test_completions=DailyLessonStatsDB.test_completions - completions.c.test_completions
+        ).where(
+            DailyLessonStatsDB.day == completions.c.day,
+            DailyLessonStatsDB.lesson_id == completions.c.lesson_id
+        ),
+        update(DailyRegistrationsDB).values(
+            registrations=DailyRegistrationsDB.registrations - 1
+        ).where(DailyRegistrationsDB.day == joined),
+    ]
+
+
+def lesson_removed(lesson_id):
+    """Drop a deleted lesson's counters"""
+    return delete(DailyLessonStatsDB).where(DailyLessonStatsDB.lesson_id == lesson_id)
+
+
+def backfill(db: Session) -> dict:
+    """Rebuild all rollups from user_lesson_access, user_test_results and users.
+
+    Runs in one transaction. The rollup tables are locked first, so writes
+    that arrive meanwhile wait and then apply their increments on top of
+    the rebuilt counters.
+    """
+    db.execute(text("LOCK TABLE daily_lesson_stats, daily_registrations IN EXCLUSIVE MODE"))
+    db.execute(delete(DailyLessonStatsDB))
+    db.execute(delete(DailyRegistrationsDB))
+
+    stats = DailyLessonStatsDB.__table__
+    purchase_day = cast(UserLessonAccessDB.paid_at, Date)
+    db.execute(insert(stats).from_select(
+        ["day", "lesson_id", "purchases", "revenue", "test_completions"],
+        select(
+            purchase_day,
+            UserLessonAccessDB.lesson_id,
+            func.count(UserLessonAccessDB.id),
+            func.coalesce(func.sum(UserLessonAccessDB.amount), 0),
+            literal(0)
+        ).where(UserLessonAccessDB.paid_at.isnot(None)).group_by(purchase_day, UserLessonAccessDB.lesson_id)
+    ))
+
+    completion_day = cast(UserTestResultDB.ended_at, Date)
+    completions = insert(stats).from_select(
+        ["day", "lesson_id", "purchases", "revenue", "test_completions"],
+        select(
+            completion_day,
+            UserTestResultDB.lesson_id,
+            literal(0),
+            literal(0),
+            func.count(UserTestResultDB.id)
+        ).group_by(completion_day, UserTestResultDB.lesson_id)
+    )
+    db.execute(completions.on_conflict_do_update(
+        index_elements=[stats.c.day, stats.c.lesson_id],
+        set_={"test_completions": completions.excluded.test_completions}
+    ))
+
+    joined_day = cast(UserDB.joined_at, Date)
+    db.execute(insert(DailyRegistrationsDB.__table__).from_select(
+        ["day", "registrations"],
+        select(joined_day, func.count(UserDB.id)).where(UserDB.joined_at.isnot(None)).group_by(joined_day)
+    ))
+
+    db.commit()
+
+    return {
+        "lesson_days": db.query(func.count()).select_from(DailyLessonStatsDB).scalar(),
+        "registration_days": db.query(func.count()).select_from(DailyRegistrationsDB).scalar(),
+    }
@@ -0,0 +1,108 @@
+"""
+Time-decayed trending score for articles.
+
+A view that happened h hours ago is worth 2^(-h / TRENDING_HALF_LIFE_HOURS)
+views now. Instead of decaying every article on a timer, the score is kept
+in log space relative to a fixed epoch:
+
+    trending_score = ln( sum(views_i * e^(λ * (t_i - EPOCH))) )
+
+Decaying everything by the same factor does not change the order, so this
+ranks articles exactly like the decayed view count and only needs updating
+when views arrive: the view counter flush adds each batch with a logaddexp.
+The hourly buckets the flush appends keep the raw data for rebuild().
+"""
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete, func, literal, Float
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.scheduler import scheduler
+from app.models.article import ArticleDB, ArticleViewBucketDB
+
+EPOCH = datetime(2024, 1, 1)
+DECAY_PER_HOUR = math.log(2) / settings.TRENDING_HALF_LIFE_HOURS
+
+
+def _hours_since_epoch(at: datetime) -> float:
+    return (at - EPOCH).total_seconds() / 3600
+
+
+def current_hour(at: datetime = None) -> datetime:
+    return (at or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+
+
+def logaddexp(a, b):
+    """ln(e^a + e^b) without overflowing"""
+    return func.greatest(a, b) + func.ln(1 + func.exp(-func.abs(a - b)))
+
+
+def score_after_views(views, at: datetime = None):
+    """New trending_score once `views` (a SQL expression) arrived at `at`"""
+    increment = func.ln(views) + literal(DECAY_PER_HOUR * _hours_since_epoch(at or datetime.utcnow()), Float)
+    return logaddexp(ArticleDB.trending_score, increment)
+
+
+def bucket_upsert(deltas, hour: datetime):
+    """Add (id, views) rows of a VALUES clause to the hour's buckets.
+
+    Joined to articles so an article deleted since it was viewed is skipped
+    instead of failing the whole batch on the foreign key.
+    """
+    buckets = ArticleViewBucketDB.__table__
+    stmt = insert(buckets).from_select(
+        ["article_id", "hour", "views"],
+        select(deltas.c.id, literal(hour), deltas.c.views).join(ArticleDB, ArticleDB.id == deltas.c.id)
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[buckets.c.article_id, buckets.c.hour],
+        set_={"views": buckets.c.views + stmt.excluded.views}
+    )
+
+
+def rebuild(db: Session) -> int:
+    """Recompute every trending_score from the retained buckets, e.g. after
+    changing TRENDING_HALF_LIFE_HOURS. Returns the number of articles updated."""
+    weight = func.ln(ArticleViewBucketDB.views) + DECAY_PER_HOUR * (
+        func.extract("epoch", ArticleViewBucketDB.hour - EPOCH) / 3600
+    )
+    weighted = select(
+        ArticleViewBucketDB.article_id,
+        weight.label("weight"),
+        func.max(weight).over(partition_by=ArticleViewBucketDB.article_id).label("peak")
+    ).where(ArticleViewBucketDB.views > 0).subquery()
+    # log-sum-exp, shifted by the peak so exp() cannot overflow
+    scores = select(
+        weighted.c.article_id,
+        (func.max(weighted.c.peak) + func.ln(func.sum(func.exp(weighted.c.weight - weighted.c.peak)))).label("score")
+    ).group_by(weighted.c.article_id).subquery()
+
+    # Neither statement is an edit of the article: keep updated_at as it was
+    db.execute(
+        update(ArticleDB)
+        .where(ArticleDB.trending_score != 0)
+        .values(trending_score=0, updated_at=ArticleDB.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    updated = db.execute(
+        update(ArticleDB)
+        .where(ArticleDB.id == scores.c.article_id)
+        .values(trending_score=scores.c.score, updated_at=ArticleDB.updated_at)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return updated
+
+
+async def drop_old_buckets():
+    cutoff = current_hour() - timedelta(days=settings.TRENDING_BUCKET_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(ArticleViewBucketDB).where(ArticleViewBucketDB.hour < cutoff))
+        await db.commit()
+
+
+scheduler.add_job(drop_old_buckets, "interval", hours=6, id="drop_old_view_buckets")
@@ -0,0 +1,28 @@
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+from app.services.cache import shared_cache
+from app.utils.cache import TTLCache
+
+
+class CachedUser(NamedTuple):
+    id: uuid.UUID
+    phone_number: str
+    joined_at: Optional[datetime]
+
+
+# telegram_id -> CachedUser. Filled on registration and on first lookup,
+# invalidated in every worker when the admin deletes the user (through
+# shared_cache.invalidate("users", telegram_id)).
+user_cache = TTLCache(max_size=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+register_metrics("user_cache", user_cache.stats)
+shared_cache.on_invalidate("users", lambda telegram_id: user_cache.invalidate(int(telegram_id)))
+
+
+def cache_user(user) -> CachedUser:
+    cached = CachedUser(user.id, user.phone_number, user.joined_at)
+    user_cache.put(user.telegram_id, cached)
+    return cached
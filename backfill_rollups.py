@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Rebuild the dashboard rollup tables (daily_lesson_stats, daily_registrations)
+from existing purchases, test results and users.
+
+Run once after deploying the rollups, or any time the counters need to be
+recomputed. Safe to run while the API is serving traffic.
+"""
+from app.core.database import SessionLocal, init_db
+from app.services import rollups
+
+
+def backfill_rollups():
+    """Recompute all dashboard rollups"""
+    init_db()
+    db = SessionLocal()
+
+    try:
+        counts = rollups.backfill(db)
+        print(f"✅ Rollups rebuilt: {counts['lesson_days']} lesson-days, "
+              f"{counts['registration_days']} registration days")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🚀 Rebuilding dashboard rollups...")
+    backfill_rollups()
+    print("🎉 Done!")
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Concurrent load benchmark for the API.
+
+Run it against a running server before and after a change and compare the
+numbers, e.g.:
+
+    python benchmark.py bot --telegram-id 123456 --concurrency 50 --requests 2000
+    python benchmark.py bot --telegram-id 123456 --admin-token <jwt>   # + server cache hit rates
+    python benchmark.py mixed --telegram-id 123456 --admin-token <jwt>
+    python benchmark.py submit --telegram-id 123456 --lesson-id <uuid> --concurrency 20
+    python benchmark.py bot-burst --telegram-id 123456 --lesson-id <uuid> --concurrency 200
+    python benchmark.py bot-burst --telegram-id 123456 --users 200 --concurrency 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_load(
+    session: aiohttp.ClientSession,
+    urls: List[str],
+    total: int,
+    concurrency: int,
+    headers: Optional[Dict[str, str]] = None,
+    method: str = "GET",
+    payload: Optional[dict] = None
+) -> dict:
+    """Fire `total` requests cycling over `urls` with `concurrency` workers"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            url = urls[i % len(urls)]
+            started = time.perf_counter()
+            try:
+                async with session.request(method, url, headers=headers, json=payload) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "rps": total / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def print_report(name: str, stats: dict):
+    print(f"📊 {name}")
+    print(f"   requests: {stats['requests']}  errors: {stats['errors']}  time: {stats['elapsed_s']:.2f}s")
+    print(f"   throughput: {stats['rps']:.1f} req/s")
+    print(
+        f"   latency: mean {stats['mean_ms']:.1f}ms  p50 {stats['p50_ms']:.1f}ms  "
+        f"p95 {stats['p95_ms']:.1f}ms  p99 {stats['p99_ms']:.1f}ms"
+    )
+
+
+def bot_urls(base_url: str, telegram_id: int) -> List[str]:
+    return [
+        f"{base_url}/bot/user/{telegram_id}/lessons",
+        f"{base_url}/bot/user/{telegram_id}/stats",
+        f"{base_url}/bot/user/{telegram_id}/progress",
+        f"{base_url}/bot/user/{telegram_id}/results",
+    ]
+
+
+async def fetch_metrics(session: aiohttp.ClientSession, args) -> dict:
+    """Server-side metrics from /admin/metrics (requires --admin-token)"""
+    if not args.admin_token:
+        return {}
+    headers = {"Authorization": f"Bearer {args.admin_token}"}
+    async with session.get(f"{args.base_url}/admin/metrics", headers=headers) as response:
+        return await response.json() if response.status == 200 else {}
+
+
+def print_cache_delta(name: str, before: dict, after: dict):
+    """Hits/misses accumulated by one server cache during the run"""
+    if name not in after:
+        return
+    hits = after[name]["hits"] - before.get(name, {}).get("hits", 0)
+    misses = after[name]["misses"] - before.get(name, {}).get("misses", 0)
+    lookups = hits + misses
+    rate = hits / lookups * 100 if lookups else 0
+    print(f"   {name}: {hits} hits / {misses} misses ({rate:.1f}% hit rate)")
+
+
+async def bench_bot(args):
+    async with aiohttp.ClientSession() as session:
+        before = await fetch_metrics(session, args)
+        stats = await run_load(session, bot_urls(args.base_url, args.telegram_id), args.requests, args.concurrency)
+        after = await fetch_metrics(session, args)
+    print_report("Bot API", stats)
+    print_cache_delta("user_cache", before, after)
+
+
+async def bench_submit(args):
+    """Concurrent test submissions by one user for one lesson (bot retries, double taps)"""
+    if not args.lesson_id:
+        raise SystemExit("❌ --lesson-id is required for the submit scenario")
+
+    base = f"{args.base_url}/bot/user/{args.telegram_id}/lesson/{args.lesson_id}"
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base}/questions") as response:
+            if response.status != 200:
+                raise SystemExit(f"❌ Cannot load questions: {response.status} {await response.text()}")
+            questions = await response.json()
+        payload = {"answers": [{"question_id": q["id"], "selected_option": 0} for q in questions]}
+        stats = await run_load(session, [f"{base}/test"], args.requests, args.concurrency, method="POST", payload=payload)
+    print_report(f"Test submit ({len(questions)} questions)", stats)
+
+
+async def bench_bot_burst(args):
+    """Bursts of taps going through the bot's own APIClient (single-flight).
+
+    Single-flight only merges requests for the same URL, and the bot's URLs
+    contain the Telegram ID, so only repeated taps by one user collapse.
+    With --users N the taps of a wave are spread over N users (Telegram IDs
+    --telegram-id .. --telegram-id + N - 1), as when many users open a newly
+    published lesson at once; expect about N upstream requests per wave.
+    """
+    from bot.services.api_client import APIClient
+
+    api = APIClient(args.base_url)
+    users = [args.telegram_id + i for i in range(max(1, args.users))]
+    waves = max(1, args.requests // args.concurrency)
+    started = time.perf_counter()
+    try:
+        for _ in range(waves):
+            # Start every wave cold, as if the lesson had just gone live
+            for telegram_id in users:
+                api.clear_user_cache(telegram_id)
+            taps = [users[i % len(users)] for i in range(args.concurrency)]
+            calls = [api.get_user_lessons(telegram_id) for telegram_id in taps]
+            if args.lesson_id:
+                calls += [api.get_lesson_questions(telegram_id, args.lesson_id) for telegram_id in taps]
+            await asyncio.gather(*calls)
+    finally:
+        await api.close()
+    elapsed = time.perf_counter() - started
+
+    stats = api.single_flight.stats()
+    print(f"📊 Bot client burst ({waves} waves x {args.concurrency} concurrent taps by {len(users)} user(s))")
+    print(f"   calls: {stats['calls']}  upstream requests: {stats['upstream']}  time: {elapsed:.2f}s")
+    print(f"   coalesced: {stats['coalesced']} ({stats['dedup_ratio'] * 100:.1f}% of calls deduplicated)")
+
+
+async def bench_articles(args):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{args.base_url}/v1/articles?limit=10") as response:
+            listing = await response.json()
+        urls = [f"{args.base_url}/v1/articles?page={page}" for page in range(1, 6)]
+        urls += [f"{args.base_url}/v1/articles/{article['slug']}" for article in listing.get("data", [])]
+        stats = await run_load(session, urls, args.requests, args.concurrency)
+    print_report("Public articles", stats)
+
+
+async def bench_mixed(args):
+    """Bot traffic while the admin dashboard is hammered in parallel"""
+    if not args.admin_token:
+        raise SystemExit("❌ --admin-token is required for the mixed scenario")
+
+    admin_headers = {"Authorization": f"Bearer {args.admin_token}"}
+    async with aiohttp.ClientSession() as session:
+        bot_stats, admin_stats = await asyncio.gather(
+            run_load(session, bot_urls(args.base_url, args.telegram_id), args.requests, args.concurrency),
+            run_load(
+                session,
+                [f"{args.base_url}/admin/dashboard", f"{args.base_url}/admin/users"],
+                max(1, args.requests // 10),
+                max(1, args.concurrency // 10),
+                headers=admin_headers
+            )
+        )
+    print_report("Bot API (under admin load)", bot_stats)
+    print_report("Admin dashboard/users", admin_stats)
+
+
+SCENARIOS = {
+    "bot": bench_bot,
+    "articles": bench_articles,
+    "mixed": bench_mixed,
+    "submit": bench_submit,
+    "bot-burst": bench_bot_burst,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load benchmark for the API")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--telegram-id", type=int, default=1)
+    parser.add_argument("--admin-token", default=None)
+    parser.add_argument("--lesson-id", default=None)
+    parser.add_argument("--users", type=int, default=1, help="bot-burst: spread each wave over this many users")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"🚀 Running '{args.scenario}' against {args.base_url} "
+          f"({args.requests} requests, concurrency {args.concurrency})")
+    asyncio.run(SCENARIOS[args.scenario](args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Article search benchmark: ILIKE scan vs. full-text search.
+
+Seeds a synthetic corpus (50k articles by default) into a dedicated
+"bench-search" category and times the old `ILIKE '%term%'` filter against
+the GIN-indexed tsvector search with ts_rank ordering, e.g.:
+
+    python benchmark_search.py --articles 50000 --runs 20
+    python benchmark_search.py --cleanup
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import select, func, desc, text, delete
+
+from app.core.database import SessionLocal, init_db
+from app.models.article import ArticleDB, CategoryDB
+from app.services import article_search
+
+BENCH_CATEGORY = "bench-search"
+SEED_BATCH = 2000
+TERMS = ["namoz", "tahorat vaqti", "ramazon ro'za", "zakot"]
+
+WORDS = (
+    "namoz tahorat vaqti qibla rakat sajda ruku takbir azon iqomat juma "
+    "ramazon roza zakot haj umra duo zikr sura oyat hadis sunnat farz vojib "
+    "masjid imom jamoat bomdod peshin asr shom xufton vitr tarovih"
+).split()
+
+
+def seed(db, count: int) -> CategoryDB:
+    """Make sure the bench category holds `count` synthetic articles"""
+    category = db.query(CategoryDB).filter(CategoryDB.slug == BENCH_CATEGORY).first()
+    if not category:
+        category = CategoryDB(name="Search benchmark", slug=BENCH_CATEGORY)
+        db.add(category)
+        db.flush()
+
+    existing = db.query(func.count(ArticleDB.id)).filter(ArticleDB.category_id == category.id).scalar()
+    if count > existing:
+        print(f"🌱 Seeding {count - existing} articles...")
+    # Bodies of ~300 pseudo-random words drawn from WORDS, generated in SQL.
+    # Batches keep every INSERT well under the statement timeout.
+    for start in range(existing + 1, count + 1, SEED_BATCH):
+        db.execute(text("""
+            INSERT INTO articles (id, title, slug, content, excerpt, category_id, tags,
+                                  is_published, published_at, view_count, importance_score,
+                                  created_at, updated_at)
+            SELECT gen_random_uuid(),
+                   'Bench ' || n || ' ' || (CAST(:words AS text[]))[1 + n % cardinality(CAST(:words AS text[]))],
+                   'bench-search-' || n,
+                   (SELECT string_agg((CAST(:words AS text[]))[1 + floor(random() * cardinality(CAST(:words AS text[])))::int], ' ')
+                      FROM generate_series(1, 300) WHERE n > 0),
+                   'Synthetic article ' || n,
+                   :category_id, ARRAY['bench'], true, :now - n * interval '1 minute',
+                   0, 0, :now, :now
+              FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS n
+        """), {
+            "words": WORDS,
+            "category_id": category.id,
+            "now": datetime.utcnow(),
+            "start": start,
+            "stop": min(start + SEED_BATCH - 1, count),
+        })
+        db.commit()
+    db.commit()
+    return category
+
+
+def time_query(db, stmt, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        db.execute(stmt).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"mean": statistics.fmean(timings), "p95": sorted(timings)[int(0.95 * (len(timings) - 1))]}
+
+
+def ilike_query(term: str, limit: int):
+    pattern = f"%{term}%"
+    return select(ArticleDB.id).where(
+        ArticleDB.is_published == True,
+        ArticleDB.title.ilike(pattern) | ArticleDB.content.ilike(pattern)
+    ).order_by(desc(ArticleDB.published_at)).limit(limit)
+
+
+def fts_query(term: str, limit: int):
+    return select(ArticleDB.id).where(
+        ArticleDB.is_published == True,
+        article_search.matches(term)
+    ).order_by(desc(article_search.rank(term)), desc(ArticleDB.published_at)).limit(limit)
+
+
+def cleanup(db):
+    category = db.query(CategoryDB).filter(CategoryDB.slug == BENCH_CATEGORY).first()
+    if category:
+        db.execute(delete(ArticleDB).where(ArticleDB.category_id == category.id))
+        db.delete(category)
+        db.commit()
+    print("🧹 Benchmark articles removed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ILIKE vs full-text article search")
+    parser.add_argument("--articles", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--cleanup", action="store_true", help="remove the synthetic corpus and exit")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.cleanup:
+            cleanup(db)
+            return
+
+        seed(db, args.articles)
+        db.execute(text("ANALYZE articles"))
+        print(f"🚀 Timing {args.runs} runs per term (limit {args.limit})")
+        for term in TERMS:
+            old = time_query(db, ilike_query(term, args.limit), args.runs)
+            new = time_query(db, fts_query(term, args.limit), args.runs)
+            print(f"📊 '{term}'")
+            print(f"   ILIKE:     mean {old['mean']:.1f}ms  p95 {old['p95']:.1f}ms")
+            print(f"   full-text: mean {new['mean']:.1f}ms  p95 {new['p95']:.1f}ms  "
+                  f"({old['mean'] / new['mean']:.1f}x)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Serialization and compression benchmark for large admin responses.
+
+Builds payloads shaped like /admin/access/all and
+/admin/lessons/{id}/results (--rows rows, 10k by default; neither endpoint
+is paginated) and like one full page of /admin/users, which returns at most
+USERS_PAGE_MAX rows. It compares the old path (jsonable_encoder +
+JSONResponse) with ORJSONResponse, then reports CPU per response and bytes
+on the wire uncompressed, gzip and brotli:
+
+    python benchmark_serialization.py --rows 10000 --runs 20
+"""
+import argparse
+import gzip
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import brotli
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.core.config import settings
+from app.utils.pagination import encode_cursor
+
+# Upper bound of the `limit` parameter of /admin/users (app/api/admin.py)
+USERS_PAGE_MAX = 200
+
+
+def access_rows(count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "user_name": f"Foydalanuvchi {i}",
+            "lesson_id": str(uuid.uuid4()),
+            "lesson_title": f"Namoz darsi {i % 40}",
+            "amount": 50000,
+            "paid_at": now - timedelta(minutes=i),
+            "notes": "Admin granted access"
+        }
+        for i in range(count)
+    ]
+
+
+def user_rows(count: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "data": [
+            {
+                "id": str(uuid.uuid4()),
+                "full_name": f"Foydalanuvchi {i}",
+                "telegram_id": 100000000 + i,
+                "phone_number": f"+99890{i:07d}",
+                "joined_at": now - timedelta(minutes=i),
+                "total_lessons_purchased": i % 7,
+                "total_spent": (i % 7) * 50000
+            }
+            for i in range(count)
+        ],
+        "meta": {"limit": count, "sort": "joined_at", "next_cursor": encode_cursor([now, str(uuid.uuid4())]), "has_more": True}
+    }
+
+
+def result_rows(count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "user_name": f"Foydalanuvchi {i}",
+            "score": i % 101,
+            "total_questions": 10,
+            "completion_time": "00:04:12",
+            "started_at": now - timedelta(minutes=i, seconds=252),
+            "ended_at": now - timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+
+def cpu_ms(fn, runs: int) -> float:
+    """Mean CPU time of fn() in milliseconds"""
+    started = time.process_time()
+    for _ in range(runs):
+        fn()
+    return (time.process_time() - started) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON rendering and compression of large admin responses")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = {
+        "/admin/access/all": (args.rows, access_rows(args.rows)),
+        "/admin/users": (min(args.rows, USERS_PAGE_MAX), user_rows(min(args.rows, USERS_PAGE_MAX))),
+        "/admin/lessons/{id}/results": (args.rows, result_rows(args.rows)),
+    }
+
+    print(f"🚀 {args.runs} runs per response")
+    for name, (rows, payload) in payloads.items():
+        old_cpu = cpu_ms(lambda: JSONResponse(jsonable_encoder(payload)), args.runs)
+        new_cpu = cpu_ms(lambda: ORJSONResponse(payload), args.runs)
+
+        body = ORJSONResponse(payload).body
+        gzip_cpu = cpu_ms(lambda: gzip.compress(body, compresslevel=9), args.runs)
+        brotli_cpu = cpu_ms(
+            lambda: brotli.compress(body, quality=settings.BROTLI_QUALITY, mode=brotli.MODE_TEXT), args.runs
+        )
+        gzipped = len(gzip.compress(body, compresslevel=9))
+        brotlied = len(brotli.compress(body, quality=settings.BROTLI_QUALITY, mode=brotli.MODE_TEXT))
+
+        print(f"📊 {name} ({rows} rows)")
+        print(f"   render CPU: json {old_cpu:.1f}ms  orjson {new_cpu:.1f}ms  ({old_cpu / new_cpu:.1f}x)")
+        print(f"   bytes: raw {len(body) / 1024:.0f}KB  gzip {gzipped / 1024:.0f}KB ({gzip_cpu:.1f}ms)  "
+              f"brotli q{settings.BROTLI_QUALITY} {brotlied / 1024:.0f}KB ({brotli_cpu:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,40 @@ class BotConfig:
     CONNECT_TIMEOUT: int = int(os.getenv("CONNECT_TIMEOUT", "30"))
     POOL_TIMEOUT: int = int(os.getenv("POOL_TIMEOUT", "30"))
     
+    # HTTP transport to the backend API (aiohttp). Idempotent requests (GET,
+    # HEAD and test submits, which carry an Idempotency-Key) are retried on
+    # connection errors, timeouts and 502/503/504 with jittered exponential
+    # backoff, so the bot rides out an API restart.
+    API_CONNECTION_LIMIT: int = int(os.getenv("API_CONNECTION_LIMIT", "100"))
+    API_CONNECTION_LIMIT_PER_HOST: int = int(os.getenv("API_CONNECTION_LIMIT_PER_HOST", "50"))
+    API_KEEPALIVE_TIMEOUT: float = float(os.getenv("API_KEEPALIVE_TIMEOUT", "30"))
+    API_DNS_CACHE_TTL: int = int(os.getenv("API_DNS_CACHE_TTL", "300"))
+    API_TIMEOUT_TOTAL: float = float(os.getenv("API_TIMEOUT_TOTAL", "10"))
+    API_TIMEOUT_CONNECT: float = float(os.getenv("API_TIMEOUT_CONNECT", "3"))
+    API_RETRY_ATTEMPTS: int = int(os.getenv("API_RETRY_ATTEMPTS", "4"))
+    API_RETRY_BACKOFF: float = float(os.getenv("API_RETRY_BACKOFF", "0.5"))
+    API_RETRY_MAX_BACKOFF: float = float(os.getenv("API_RETRY_MAX_BACKOFF", "4"))
+    # Circuit breaker: after N consecutive failed requests the bot stops
+    # calling the API for RECOVERY_TIMEOUT seconds, then lets probe requests
+    # through. Meanwhile cached lessons/results are shown as possibly outdated.
+    API_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("API_BREAKER_FAILURE_THRESHOLD", "5"))
+    API_BREAKER_RECOVERY_TIMEOUT: float = float(os.getenv("API_BREAKER_RECOVERY_TIMEOUT", "15"))
+    API_BREAKER_HALF_OPEN_CALLS: int = int(os.getenv("API_BREAKER_HALF_OPEN_CALLS", "1"))
+    # Per-endpoint latency summary in the log every N seconds; 0 disables it
+    API_STATS_LOG_INTERVAL: int = int(os.getenv("API_STATS_LOG_INTERVAL", "300"))
+    
+    # Per-user cache of lessons, lesson details, results, stats and progress.
+    # A user's entries are dropped after a test submit and by the refresh
+    # buttons; the TTL bounds staleness after admin changes (e.g. access granted).
+    API_CACHE_TTL: int = int(os.getenv("API_CACHE_TTL", "60"))
+    API_CACHE_MAX_ENTRIES: int = int(os.getenv("API_CACHE_MAX_ENTRIES", "20000"))
+    
+    # Telegram IDs known to be registered. Only positive answers are cached;
+    # the TTL bounds how long a user deleted in the admin panel is still
+    # treated as registered.
+    REGISTERED_CACHE_SIZE: int = int(os.getenv("REGISTERED_CACHE_SIZE", "100000"))
+    REGISTERED_CACHE_TTL: int = int(os.getenv("REGISTERED_CACHE_TTL", "3600"))
+    
     def __post_init__(self):
         if not self.BOT_TOKEN:
             raise ValueError("BOT_TOKEN environment variable is required")
@@ -1,9 +1,10 @@
 import logging
+import uuid
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.error import BadRequest
 from bot.services.user_service import UserService
-from bot.services.api_client import APIClient
+from bot.services.api_client import APIClient, is_stale
 from bot.utils.texts import BotTexts
 from bot.utils.helpers import get_user_display_name, format_date, calculate_correct_answers
 from bot.keyboards.main_menu import get_main_menu_keyboard
@@ -75,6 +76,9 @@ class CallbackHandler:
                 await self.show_latest_results(update, context)
             elif data == "refresh_data":
                 await self.refresh_data(update, context)
+            elif data == "refresh_lessons":
+                await self.user_service.clear_cache(user.id)
+                await self.show_lessons(update, context)
             elif data.startswith("lesson_"):
                 lesson_id = data.split("_", 1)[1]
                 await self.show_lesson_detail(update, context, lesson_id)
@@ -131,6 +135,8 @@ class CallbackHandler:
                 text += f"{status_line}\n"
             
             keyboard = get_lessons_list_keyboard(lessons_data)
+            if is_stale(lessons_data):
+                text = BotTexts.STALE_DATA + text
         
         await self.safe_edit_message(update, text, keyboard, "Markdown")
     
@@ -186,6 +192,9 @@ class CallbackHandler:
                 lesson_id
             )
         
+        if is_stale(lesson_data):
+            text = BotTexts.STALE_DATA + text
+        
         await self.safe_edit_message(update, text, keyboard, "Markdown")
     
     async def start_test(self, update: Update, context: ContextTypes.DEFAULT_TYPE, lesson_id: str):
@@ -202,6 +211,8 @@ class CallbackHandler:
         context.user_data["test_answers"] = []
         context.user_data["current_question"] = 0
         context.user_data["lesson_id"] = lesson_id
+        # Idempotency key of this attempt; reused if the submit is repeated
+        context.user_data["attempt_id"] = str(uuid.uuid4())
         
         await self.show_question(update, context)
     
@@ -255,7 +266,7 @@ class CallbackHandler:
         lesson_id = context.user_data.get("lesson_id")
         answers = context.user_data.get("test_answers", [])
         
-        result_data = await self.api.submit_test(user.id, lesson_id, answers)
+        result_data = await self.api.submit_test(user.id, lesson_id, answers, context.user_data.get("attempt_id"))
         
         if not result_data:
             await self.safe_edit_message(update,BotTexts.TEST_SAVE_ERROR)
@@ -299,6 +310,8 @@ class CallbackHandler:
                 text += f"{score_icon} {result['lesson_title']}: {result['score']}%\n"
             
             keyboard = get_results_list_keyboard(results_data)
+            if is_stale(results_data):
+                text = BotTexts.STALE_DATA + text
         
         await self.safe_edit_message(update, text, keyboard, "Markdown")
     
@@ -389,6 +402,8 @@ class CallbackHandler:
                     text += f"📚 {lesson['title']} - {status}\n"
                 
                 keyboard = get_lessons_list_keyboard(accessible_lessons[:5])
+                if is_stale(lessons_data):
+                    text = BotTexts.STALE_DATA + text
         
         await self.safe_edit_message(update, text, keyboard, "Markdown")
     
@@ -435,18 +450,21 @@ class CallbackHandler:
                 text += f"{score_icon} {result['lesson_title']}: {result['score']}%\n"
             
             keyboard = get_results_list_keyboard(results_data)
+            if is_stale(results_data):
+                text = BotTexts.STALE_DATA + text
         
         await self.safe_edit_message(update, text, keyboard, "Markdown")
     
     async def refresh_data(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Refresh user data and show main menu"""
+        user = update.effective_user
         await self.safe_edit_message(update, "🔄 Ma'lumotlar yangilanmoqda...", None, "Markdown")
         
         # Small delay to show loading message
         import asyncio
         await asyncio.sleep(1)
         
-        # Clear any cached data if your service has caching
-        # await self.user_service.clear_cache(user.id)
+        # Next views load fresh data from the API
+        await self.user_service.clear_cache(user.id)
         
         await self.show_main_menu(update, context)
\ No newline at end of file
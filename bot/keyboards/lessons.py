@@ -17,7 +17,7 @@ def get_lessons_list_keyboard(lessons: List[Dict[str, Any]]) -> InlineKeyboardMa
         )])
     
     # Add control buttons
-    keyboard.append([InlineKeyboardButton(BotTexts.REFRESH, callback_data="lessons")])
+    keyboard.append([InlineKeyboardButton(BotTexts.REFRESH, callback_data="refresh_lessons")])
     keyboard.append([InlineKeyboardButton(BotTexts.MAIN_MENU, callback_data="start")])
     
     return InlineKeyboardMarkup(keyboard)
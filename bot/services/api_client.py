@@ -1,64 +1,294 @@
 import aiohttp
+import asyncio
 import logging
+import random
+import time
 from typing import Dict, List, Optional, Any
+from bot.config import bot_config
+from bot.utils.cache import TTLCache, UserResponseCache
+from bot.utils.circuit_breaker import CircuitBreaker
 from bot.utils.helpers import log_user_action
+from bot.utils.metrics import EndpointMetrics, endpoint_name
+from bot.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Safe to repeat; other requests are retried only when the caller says so
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+# Gateway errors seen while the API restarts or is redeployed
+RETRY_STATUSES = {502, 503, 504}
+
+class APIUnavailable(Exception):
+    """The API did not answer: circuit open, connection error, timeout or 5xx"""
+
+class StaleList(list):
+    """Cached list response served while the API is unavailable"""
+
+class StaleDict(dict):
+    """Cached object response served while the API is unavailable"""
+
+def is_stale(response: Any) -> bool:
+    """True for cached data served because the API was unavailable"""
+    return isinstance(response, (StaleList, StaleDict))
+
 class APIClient:
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
         self.session: Optional[aiohttp.ClientSession] = None
+        self.metrics = EndpointMetrics()
+        self.single_flight = SingleFlight()
+        self.breaker = CircuitBreaker(
+            "api",
+            failure_threshold=bot_config.API_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=bot_config.API_BREAKER_RECOVERY_TIMEOUT,
+            half_open_max_calls=bot_config.API_BREAKER_HALF_OPEN_CALLS
+        )
+        self._stats_task: Optional[asyncio.Task] = None
+        self.responses = UserResponseCache(
+            max_entries=bot_config.API_CACHE_MAX_ENTRIES,
+            ttl=bot_config.API_CACHE_TTL
+        )
+        self.registered_users = TTLCache(
+            max_size=bot_config.REGISTERED_CACHE_SIZE,
+            ttl=bot_config.REGISTERED_CACHE_TTL
+        )
     
     async def initialize(self):
         """Initialize HTTP session"""
-        self.session = aiohttp.ClientSession()
+        connector = aiohttp.TCPConnector(
+            limit=bot_config.API_CONNECTION_LIMIT,
+            limit_per_host=bot_config.API_CONNECTION_LIMIT_PER_HOST,
+            keepalive_timeout=bot_config.API_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=bot_config.API_DNS_CACHE_TTL
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=bot_config.API_TIMEOUT_TOTAL,
+            sock_connect=bot_config.API_TIMEOUT_CONNECT
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        if bot_config.API_STATS_LOG_INTERVAL > 0 and self._stats_task is None:
+            self._stats_task = asyncio.create_task(self._log_stats())
     
     async def close(self):
         """Close HTTP session"""
+        if self._stats_task:
+            self._stats_task.cancel()
+            self._stats_task = None
         if self.session:
             await self.session.close()
     
-    async def _request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Optional[Dict]:
-        """Make HTTP request to API"""
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.stats(),
+            "endpoints": self.metrics.snapshot(),
+            "single_flight": self.single_flight.stats(),
+            "responses": self.responses.stats(),
+            "registered_users": self.registered_users.stats(),
+        }
+    
+    async def _log_stats(self):
+        while True:
+            await asyncio.sleep(bot_config.API_STATS_LOG_INTERVAL)
+            for line in self.metrics.summary_lines():
+                logger.info(f"API latency {line}")
+            logger.info(f"API response cache: {self.responses.stats()}")
+            logger.info(f"API single-flight: {self.single_flight.stats()}")
+            logger.info(f"API circuit: {self.breaker.stats()}")
+    
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Delay before retry `attempt` (1-based): exponential, with half of it jittered"""
+        delay = min(bot_config.API_RETRY_MAX_BACKOFF, bot_config.API_RETRY_BACKOFF * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        headers: Optional[Dict[str, str]] = None,
+        retry: Optional[bool] = None,
+        not_found: Any = None
+    ) -> Optional[Dict]:
+        """Make HTTP request to API.
+
+        Returns the JSON body of a 200 response, not_found for a 404 and None
+        for anything else.
+        """
+        try:
+            return await self._fetch(method, endpoint, data, headers, retry, not_found)
+        except APIUnavailable:
+            return None
+    
+    async def _fetch(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        headers: Optional[Dict[str, str]] = None,
+        retry: Optional[bool] = None,
+        not_found: Any = None
+    ) -> Optional[Dict]:
+        """Like _request, but raises APIUnavailable when the API cannot answer.
+
+        Concurrent identical reads (same method and URL, e.g. a burst of
+        taps on "lessons" by one user) share one upstream request. The URLs
+        contain the Telegram ID, so reads by different users are not merged.
+        """
+        if method in IDEMPOTENT_METHODS and data is None and headers is None:
+            return await self.single_flight.do(
+                (method, endpoint),
+                lambda: self._send(method, endpoint, retry=retry, not_found=not_found)
+            )
+        return await self._send(method, endpoint, data, headers, retry, not_found)
+    
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        headers: Optional[Dict[str, str]] = None,
+        retry: Optional[bool] = None,
+        not_found: Any = None
+    ) -> Optional[Dict]:
+        """Send one request through the circuit breaker (with retries).
+
+        Idempotent requests (and any with retry=True) are retried on
+        connection errors, timeouts and gateway errors. Those errors, other
+        5xx answers and an open circuit raise APIUnavailable; a 404 returns
+        not_found and other failed requests return None.
+        """
         if not self.session:
             await self.initialize()
         
-        try:
-            url = f"{self.base_url}{endpoint}"
-            async with self.session.request(method, url, json=data) as response:
-                if response.status == 200:
-                    return await response.json()
-                elif response.status == 404:
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = max(bot_config.API_RETRY_ATTEMPTS, 1) if retry else 1
+        url = f"{self.base_url}{endpoint}"
+        name = endpoint_name(method, endpoint)
+        
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt))
+            if not self.breaker.allow():
+                # Fail fast instead of waiting on an API that is down
+                self.metrics.observe(name, 0.0, "circuit_open")
+                raise APIUnavailable(f"circuit open, {method} {endpoint} not sent")
+            last_attempt = attempt + 1 == attempts
+            started = time.perf_counter()
+            outcome = "error"
+            status = None
+            body = None
+            error_text = ""
+            try:
+                async with self.session.request(method, url, json=data, headers=headers) as response:
+                    status = response.status
+                    outcome = str(status)
+                    if status == 200:
+                        body = await response.json()
+                    elif status != 404:
+                        error_text = await response.text()
+            # A body that times out or breaks off fails the request as a whole
+            except asyncio.TimeoutError:
+                status = None
+                outcome = "timeout"
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+                status = None
+                outcome = "connection_error"
+                error_text = str(e)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                logger.error(f"API request error for {endpoint}: {e}")
+                return None
+            finally:
+                self.metrics.observe(name, (time.perf_counter() - started) * 1000, outcome)
+            
+            if status is not None and status < 500:
+                # The API answered; client errors are not an outage
+                self.breaker.record_success()
+                if status == 200:
+                    return body
+                if status == 404:
                     logger.warning(f"API endpoint not found: {endpoint}")
-                    return None
-                else:
-                    error_text = await response.text()
-                    logger.error(f"API request failed: {response.status} - {error_text}")
-                    return None
-        except Exception as e:
-            logger.error(f"API request error for {endpoint}: {e}")
-            return None
+                    return not_found
+                logger.error(f"API request failed: {status} - {error_text}")
+                return None
+            
+            self.breaker.record_failure()
+            retryable = status is None or status in RETRY_STATUSES
+            if retryable and not last_attempt:
+                logger.warning(f"API {method} {endpoint} failed ({outcome}), retrying")
+                continue
+            if status is None:
+                logger.error(f"API {method} {endpoint} failed ({outcome}) after {attempt + 1} attempt(s)")
+            else:
+                logger.error(f"API request failed: {status} - {error_text}")
+            raise APIUnavailable(f"{method} {endpoint}: {outcome}")
+    
+    async def _cached_get(self, telegram_id: int, key, endpoint: str) -> Optional[Any]:
+        """GET through the per-user response cache; failures are not cached.
+
+        While the API is unavailable the last cached response is served even
+        if it has expired, marked so that is_stale() is true for it.
+        """
+        cached = self.responses.get(telegram_id, key)
+        if cached is not None:
+            return cached
+        try:
+            result = await self._fetch("GET", endpoint)
+        except APIUnavailable:
+            stale = self.responses.get_stale(telegram_id, key)
+            if stale is None:
+                return None
+            logger.warning(f"API unavailable, serving stale {key} to user {telegram_id}")
+            return StaleList(stale) if isinstance(stale, list) else StaleDict(stale)
+        if result is not None:
+            self.responses.put(telegram_id, key, result)
+        return result
+    
+    def clear_user_cache(self, telegram_id: int):
+        """Drop everything cached for the user"""
+        self.responses.invalidate_user(telegram_id)
     
     async def get_user_lessons(self, telegram_id: int) -> Optional[List[Dict[str, Any]]]:
         """Get lessons for user"""
         log_user_action(telegram_id, "get_lessons")
-        return await self._request("GET", f"/bot/user/{telegram_id}/lessons")
+        return await self._cached_get(telegram_id, "lessons", f"/bot/user/{telegram_id}/lessons")
     
     async def get_lesson_detail(self, telegram_id: int, lesson_id: str) -> Optional[Dict[str, Any]]:
         """Get lesson details"""
         log_user_action(telegram_id, "get_lesson_detail", lesson_id)
-        return await self._request("GET", f"/bot/user/{telegram_id}/lesson/{lesson_id}")
+        return await self._cached_get(telegram_id, ("lesson", lesson_id), f"/bot/user/{telegram_id}/lesson/{lesson_id}")
     
     async def get_lesson_questions(self, telegram_id: int, lesson_id: str) -> Optional[List[Dict[str, Any]]]:
         """Get test questions for lesson"""
         log_user_action(telegram_id, "get_questions", lesson_id)
         return await self._request("GET", f"/bot/user/{telegram_id}/lesson/{lesson_id}/questions")
     
-    async def submit_test(self, telegram_id: int, lesson_id: str, answers: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-        """Submit test answers"""
+    async def submit_test(
+        self,
+        telegram_id: int,
+        lesson_id: str,
+        answers: List[Dict[str, Any]],
+        attempt_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Submit test answers.
+
+        attempt_id is sent as the Idempotency-Key: the API grades an attempt
+        once and replays the result for repeats, so failed submits are retried.
+        """
         log_user_action(telegram_id, "submit_test", f"{lesson_id} - {len(answers)} answers")
-        return await self._request("POST", f"/bot/user/{telegram_id}/lesson/{lesson_id}/test", {"answers": answers})
+        endpoint = f"/bot/user/{telegram_id}/lesson/{lesson_id}/test"
+        headers = {"Idempotency-Key": attempt_id} if attempt_id else None
+        try:
+            return await self._request("POST", endpoint, {"answers": answers}, headers, retry=bool(attempt_id))
+        finally:
+            # Results, stats and progress change; drop them even if the
+            # response was lost, as the attempt may have been saved anyway
+            self.clear_user_cache(telegram_id)
     
     async def get_user_results(self, telegram_id: int, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
         """Get user test results"""
@@ -66,7 +296,7 @@ class APIClient:
         endpoint = f"/bot/user/{telegram_id}/results"
         if limit:
             endpoint += f"?limit={limit}"
-        return await self._request("GET", endpoint)
+        return await self._cached_get(telegram_id, ("results", limit), endpoint)
     
     async def get_result_detail(self, telegram_id: int, result_id: str) -> Optional[Dict[str, Any]]:
         """Get detailed test result"""
@@ -74,12 +304,27 @@ class APIClient:
         return await self._request("GET", f"/bot/user/{telegram_id}/result/{result_id}")
     
     async def check_user_exists(self, telegram_id: int) -> bool:
-        """Check if user exists in the system"""
-        log_user_action(telegram_id, "check_user_exists")
+        """Check if user exists in the system.
+
+        Only a 404 means "not registered". When the API is unavailable or
+        fails otherwise the user is let through rather than sent to
+        registration again; that answer is not cached.
+        """
+        # Registered users stay registered: repeat commands skip the API
+        if self.registered_users.get(telegram_id):
+            return True
         
-        # Try to get user lessons - if successful, user exists
-        result = await self.get_user_lessons(telegram_id)
-        return result is not None
+        log_user_action(telegram_id, "check_user_exists")
+        try:
+            result = await self._fetch("GET", f"/bot/user/{telegram_id}/exists", not_found=False)
+        except APIUnavailable:
+            logger.warning(f"API unavailable, cannot check registration of user {telegram_id}")
+            return True
+        if result is False:
+            return False
+        if result is not None:
+            self.registered_users.put(telegram_id, True)
+        return True
     
     async def register_user(self, telegram_id: int, full_name: str, phone_number: str) -> bool:
         """Register new user"""
@@ -96,14 +341,17 @@ class APIClient:
         }
         
         result = await self._request("POST", "/bot/register", user_data)
-        return result is not None
+        if result is None:
+            return False
+        self.registered_users.put(telegram_id, True)
+        return True
     
     async def get_user_stats(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Get user statistics"""
         log_user_action(telegram_id, "get_stats")
-        return await self._request("GET", f"/bot/user/{telegram_id}/stats")
+        return await self._cached_get(telegram_id, "stats", f"/bot/user/{telegram_id}/stats")
     
     async def get_user_progress(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Get user learning progress"""
         log_user_action(telegram_id, "get_progress")
-        return await self._request("GET", f"/bot/user/{telegram_id}/progress")
\ No newline at end of file
+        return await self._cached_get(telegram_id, "progress", f"/bot/user/{telegram_id}/progress")
\ No newline at end of file
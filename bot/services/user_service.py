@@ -38,6 +38,10 @@ class UserService:
             logger.error(f"Error registering user {telegram_user.id}: {e}")
             return False
     
+    async def clear_cache(self, telegram_id: int):
+        """Forget the user's cached API responses so the next views are fresh"""
+        self.api.clear_user_cache(telegram_id)
+    
     async def get_user_lessons(self, telegram_id: int) -> Optional[list]:
         """Get lessons for registered user"""
         return await self.api.get_user_lessons(telegram_id)
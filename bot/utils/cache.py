@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded LRU whose entries expire `ttl` seconds after insert.
+
+    Not thread-safe: the bot uses it from its single event loop only.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "evictions": self.evictions,
+        }
+
+
+class UserResponseCache:
+    """Per-user TTL cache of API responses.
+
+    Entries are grouped by user so that everything cached for one user can be
+    dropped at once. The total number of entries is bounded; the least
+    recently used users are evicted first. Expired entries are kept until
+    then, so get_stale() can still serve them while the API is down.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._users: "OrderedDict[Hashable, Dict[Hashable, tuple]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+
+    def get(self, user_id: Hashable, key: Hashable) -> Optional[Any]:
+        entries = self._users.get(user_id)
+        entry = entries.get(key) if entries else None
+        if entry is None or entry[0] < time.monotonic():
+            # Expired entries stay until evicted or invalidated, for get_stale()
+            self.misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def get_stale(self, user_id: Hashable, key: Hashable) -> Optional[Any]:
+        """The last value stored for the key, even if it has expired"""
+        entries = self._users.get(user_id)
+        entry = entries.get(key) if entries else None
+        if entry is None:
+            return None
+        self.stale_hits += 1
+        return entry[1]
+
+    def put(self, user_id: Hashable, key: Hashable, value: Any):
+        entries = self._users.setdefault(user_id, {})
+        if key not in entries:
+            self._size += 1
+        entries[key] = (time.monotonic() + self.ttl, value)
+        self._users.move_to_end(user_id)
+        while self._size > self.max_entries and len(self._users) > 1:
+            _, evicted = self._users.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += len(evicted)
+
+    def invalidate_user(self, user_id: Hashable):
+        entries = self._users.pop(user_id, None)
+        if entries is not None:
+            self._size -= len(entries)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._users),
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_hits": self.stale_hits,
+        }
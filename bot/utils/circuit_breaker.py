@@ -0,0 +1,80 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while instead of waiting on it.
+
+    closed: calls go through; `failure_threshold` consecutive failures open
+    the circuit. open: calls are rejected at once for `recovery_timeout`
+    seconds. half_open: up to `half_open_max_calls` probe calls go through;
+    a success closes the circuit, a failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 15, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        log = logger.info if state == CLOSED else logger.warning
+        log(f"Circuit '{self.name}' {self.state} -> {state} (consecutive failures: {self.consecutive_failures})")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+        self.probes = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; rejected calls should fail fast"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN and self.probes < self.half_open_max_calls:
+            self.probes += 1
+            return True
+        if self.state == CLOSED:
+            return True
+        self.rejected += 1
+        return False
+
+    def release(self):
+        """A call let through by allow() ended without an outcome (e.g. cancelled)"""
+        if self.state == HALF_OPEN and self.probes > 0:
+            self.probes -= 1
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._transition(CLOSED)
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN)
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == CLOSED
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "open_for_s": round(time.monotonic() - self.opened_at, 1) if self.state != CLOSED else 0,
+        }
@@ -0,0 +1,83 @@
+import re
+from collections import Counter
+from typing import Dict, List
+
+# Upper bounds of the latency buckets in milliseconds; the last bucket is open
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_ID_SEGMENT = re.compile(r"/(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})(?=/|$)")
+
+
+def endpoint_name(method: str, endpoint: str) -> str:
+    """'GET /bot/user/123/lesson/<uuid>' -> 'GET /bot/user/{id}/lesson/{id}'"""
+    path = endpoint.split("?", 1)[0]
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+class LatencyHistogram:
+    """Request latencies of one endpoint in fixed buckets, plus outcome counts"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.outcomes: Counter = Counter()
+
+    def observe(self, elapsed_ms: float, outcome: str):
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound), len(LATENCY_BUCKETS_MS))
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.outcomes[outcome] += 1
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the percentile (max for the open bucket)"""
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else 0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip([f"<={bound}" for bound in LATENCY_BUCKETS_MS] + ["inf"], self.buckets)),
+            "outcomes": dict(self.outcomes),
+        }
+
+
+class EndpointMetrics:
+    """Latency histograms keyed by endpoint_name()"""
+
+    def __init__(self):
+        self.endpoints: Dict[str, LatencyHistogram] = {}
+
+    def observe(self, name: str, elapsed_ms: float, outcome: str):
+        histogram = self.endpoints.get(name)
+        if histogram is None:
+            histogram = self.endpoints[name] = LatencyHistogram()
+        histogram.observe(elapsed_ms, outcome)
+
+    def snapshot(self) -> dict:
+        return {name: histogram.snapshot() for name, histogram in sorted(self.endpoints.items())}
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for name, histogram in sorted(self.endpoints.items()):
+            stats = histogram.snapshot()
+            lines.append(
+                f"{name}: n={stats['count']} mean={stats['mean_ms']}ms p50<={stats['p50_ms']}ms "
+                f"p95<={stats['p95_ms']}ms p99<={stats['p99_ms']}ms max={stats['max_ms']}ms {stats['outcomes']}"
+            )
+        return lines
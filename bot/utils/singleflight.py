@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _CallCancelled(Exception):
+    """Given to the callers waiting on a call whose own caller was cancelled"""
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its result.
+
+    Only for reads: callers that arrive while a call for the same key is in
+    flight get that call's result (or exception) instead of starting another.
+    If the caller running the call is cancelled, one of the waiting callers
+    runs it again for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.upstream = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        coalesced = False
+        while (inflight := self._inflight.get(key)) is not None:
+            if not coalesced:
+                coalesced = True
+                self.coalesced += 1
+            try:
+                # shield: a cancelled waiter must not cancel the shared call
+                return await asyncio.shield(inflight)
+            except _CallCancelled:
+                continue  # the caller running it was cancelled: take over
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.upstream += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Only this caller was cancelled, not the callers waiting on it
+            future.set_exception(_CallCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "upstream": self.upstream,
+            "coalesced": self.coalesced,
+            "dedup_ratio": round(self.coalesced / self.calls, 3) if self.calls else 0,
+            "inflight": len(self._inflight),
+        }
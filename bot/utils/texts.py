@@ -104,6 +104,7 @@ Administrator bilan bog'laning: @Ekolingvist1"""
     # Errors
     GENERAL_ERROR = "❌ Xatolik yuz berdi. Qaytadan urinib ko'ring yoki administrator bilan bog'laning."
     API_ERROR = "❌ Server bilan bog'lanishda xatolik. Keyinroq qaytadan urinib ko'ring."
+    STALE_DATA = "⚠️ _Server vaqtincha ishlamayapti, ma'lumotlar eskirgan bo'lishi mumkin._\n\n"
     
     # Success indicators
     CORRECT_ANSWER = "✅"
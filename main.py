@@ -1,18 +1,38 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from brotli_asgi import BrotliMiddleware
 from app.models import *
-from app.core.database import init_db
+from app.core.config import settings
+from app.core.database import close_db
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.scheduler import scheduler
 from app.api import admin
 from app.api import admin_articles
 from app.api import articles
 from app.api import bot_simple as bot
+from app.services.cache import shared_cache
+from app.services.view_counter import view_counter
 
 app = FastAPI(
     title="Namoz Education Backend",
     description="Backend API for Namoz education platform with admin panel",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Compress large responses (admin lists run into megabytes of JSON)
+app.add_middleware(
+    BrotliMiddleware,
+    quality=settings.BROTLI_QUALITY,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_fallback=True
+)
+
+# Statement count and DB time per request (Server-Timing header, N+1 warnings)
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -30,7 +50,16 @@ app.include_router(bot.router)
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    await shared_cache.start()
+    scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    scheduler.shutdown(wait=False)
+    if settings.VIEW_FLUSH_ON_SHUTDOWN:
+        await view_counter.flush()
+    await shared_cache.close()
+    await close_db()
 
 @app.get("/")
 async def root():
@@ -0,0 +1,130 @@
+"""Baseline: the schema previously created by Base.metadata.create_all
+
+Databases that were created by create_all at startup already have this
+schema; mark them with `alembic stamp 0001_baseline` before upgrading.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("full_name", sa.String(100), nullable=False),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+        sa.Column("phone_number", sa.String(20), nullable=False),
+        sa.Column("joined_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_telegram_id", "users", ["telegram_id"], unique=True)
+    op.create_index("ix_users_phone_number", "users", ["phone_number"])
+    op.create_index("ix_users_joined_at", "users", ["joined_at"])
+
+    op.create_table(
+        "lessons",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("video_url", sa.String(500), nullable=False),
+        sa.Column("pdf_url", sa.String(500), nullable=False),
+        sa.Column("ppt_url", sa.String(500), nullable=False),
+        sa.Column("is_published", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_lessons_id", "lessons", ["id"])
+    op.create_index("ix_lessons_title", "lessons", ["title"])
+    op.create_index("ix_lessons_is_published", "lessons", ["is_published"])
+    op.create_index("ix_lessons_created_at", "lessons", ["created_at"])
+
+    op.create_table(
+        "test_questions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("lesson_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("lessons.id")),
+        sa.Column("question_text", sa.Text(), nullable=False),
+        sa.Column("options", postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column("correct_option", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_test_questions_id", "test_questions", ["id"])
+    op.create_index("ix_test_questions_lesson_id", "test_questions", ["lesson_id"])
+
+    op.create_table(
+        "user_test_results",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id")),
+        sa.Column("lesson_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("lessons.id")),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("total_questions", sa.Integer(), nullable=False),
+        sa.Column("answers", sa.JSON(), nullable=False),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("ended_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_user_test_results_id", "user_test_results", ["id"])
+    op.create_index("ix_user_test_results_user_id", "user_test_results", ["user_id"])
+    op.create_index("ix_user_test_results_lesson_id", "user_test_results", ["lesson_id"])
+    op.create_index("ix_user_test_results_started_at", "user_test_results", ["started_at"])
+
+    op.create_table(
+        "user_lesson_access",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id")),
+        sa.Column("lesson_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("lessons.id")),
+        sa.Column("is_unlocked", sa.Boolean()),
+        sa.Column("unlocked_at", sa.DateTime()),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("paid_at", sa.DateTime()),
+        sa.Column("notes", sa.Text()),
+    )
+    op.create_index("ix_user_lesson_access_id", "user_lesson_access", ["id"])
+    op.create_index("ix_user_lesson_access_user_id", "user_lesson_access", ["user_id"])
+    op.create_index("ix_user_lesson_access_lesson_id", "user_lesson_access", ["lesson_id"])
+    op.create_index("ix_user_lesson_access_is_unlocked", "user_lesson_access", ["is_unlocked"])
+    op.create_index("ix_user_lesson_access_unlocked_at", "user_lesson_access", ["unlocked_at"])
+
+    op.create_table(
+        "categories",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("slug", sa.String(100), nullable=False),
+        sa.Column("description", sa.Text()),
+    )
+    op.create_index("ix_categories_id", "categories", ["id"])
+    op.create_index("ix_categories_slug", "categories", ["slug"], unique=True)
+
+    op.create_table(
+        "articles",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("slug", sa.String(255), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("excerpt", sa.Text()),
+        sa.Column("cover_image", sa.String()),
+        sa.Column("category_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("categories.id")),
+        sa.Column("tags", postgresql.ARRAY(sa.String())),
+        sa.Column("is_published", sa.Boolean()),
+        sa.Column("published_at", sa.DateTime()),
+        sa.Column("view_count", sa.Integer()),
+        sa.Column("importance_score", sa.Float()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_articles_id", "articles", ["id"])
+    op.create_index("ix_articles_slug", "articles", ["slug"], unique=True)
+
+
+def downgrade():
+    for table in (
+        "articles", "categories", "user_lesson_access", "user_test_results",
+        "test_questions", "lessons", "users",
+    ):
+        op.drop_table(table)
@@ -0,0 +1,119 @@
+"""Rollups, article search/sorting/trending and test submission keys
+
+Tables and columns added since the baseline, while the schema was still
+created with create_all at startup.
+
+Revision ID: 0002_rollups_search_trending
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002_rollups_search_trending"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(excerpt, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(content, '')), 'C')"
+)
+
+
+def upgrade():
+    # Dashboard rollups (fill them with backfill_rollups.py)
+    op.create_table(
+        "daily_lesson_stats",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("lesson_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("lessons.id"), primary_key=True),
+        sa.Column("purchases", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.BigInteger(), nullable=False),
+        sa.Column("test_completions", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "daily_registrations",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("registrations", sa.Integer(), nullable=False),
+    )
+
+    # Admin user list: keyset pagination and prefix search
+    op.create_index("ix_users_joined_at_id", "users", ["joined_at", "id"])
+    op.create_index(
+        "ix_users_phone_number_prefix", "users", ["phone_number"],
+        postgresql_ops={"phone_number": "text_pattern_ops"}
+    )
+    op.execute("CREATE INDEX ix_users_full_name_lower_prefix ON users (lower(full_name) text_pattern_ops)")
+
+    # Article full-text search, sorting and trending
+    op.add_column("articles", sa.Column(
+        "search_vector", postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True)
+    ))
+    op.create_index("ix_articles_search_vector", "articles", ["search_vector"], postgresql_using="gin")
+    op.add_column("articles", sa.Column("trending_score", sa.Float(), nullable=False, server_default="0"))
+    for name, column in (
+        ("latest", "published_at"),
+        ("popular", "view_count"),
+        ("important", "importance_score"),
+        ("trending", "trending_score"),
+    ):
+        op.create_index(
+            f"ix_articles_published_{name}", "articles", [column, "id"],
+            postgresql_where=sa.text("is_published")
+        )
+
+    op.create_table(
+        "catalog_version",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "article_view_buckets",
+        sa.Column(
+            "article_id", postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True
+        ),
+        sa.Column("hour", sa.DateTime(), primary_key=True),
+        sa.Column("views", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_article_view_buckets_hour", "article_view_buckets", ["hour"])
+
+    # One test result per user and lesson: keep the latest attempt
+    op.execute("""
+        DELETE FROM user_test_results r
+        USING user_test_results newer
+        WHERE r.user_id = newer.user_id
+          AND r.lesson_id = newer.lesson_id
+          AND (r.ended_at, r.id) < (newer.ended_at, newer.id)
+    """)
+    op.create_unique_constraint("uq_user_test_results_user_lesson", "user_test_results", ["user_id", "lesson_id"])
+
+    op.create_table(
+        "test_submission_keys",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("key", sa.String(100), primary_key=True),
+        sa.Column("lesson_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("response", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_test_submission_keys_created_at", "test_submission_keys", ["created_at"])
+
+
+def downgrade():
+    op.drop_table("test_submission_keys")
+    op.drop_constraint("uq_user_test_results_user_lesson", "user_test_results", type_="unique")
+    op.drop_table("article_view_buckets")
+    op.drop_table("catalog_version")
+    for name in ("latest", "popular", "important", "trending"):
+        op.drop_index(f"ix_articles_published_{name}", table_name="articles")
+    op.drop_column("articles", "trending_score")
+    op.drop_index("ix_articles_search_vector", table_name="articles")
+    op.drop_column("articles", "search_vector")
+    op.drop_index("ix_users_full_name_lower_prefix", table_name="users")
+    op.drop_index("ix_users_phone_number_prefix", table_name="users")
+    op.drop_index("ix_users_joined_at_id", table_name="users")
+    op.drop_table("daily_registrations")
+    op.drop_table("daily_lesson_stats")
@@ -0,0 +1,69 @@
+"""Index the hot lookups and drop redundant single-column indexes
+
+- Primary keys already have a unique index; the extra ix_<table>_id ones
+  only slowed down writes.
+- users.phone_number and users.joined_at are covered by the prefix and
+  (joined_at, id) indexes.
+- The unique (user_id, lesson_id) constraint on user_test_results serves
+  lookups by user; lesson results are read by (lesson_id, ended_at).
+- Access checks filter on (user_id, lesson_id); is_unlocked and
+  unlocked_at were never filtered on.
+- The bot catalog reads published lessons ordered by created_at.
+
+Revision ID: 0003_query_shaped_indexes
+Revises: 0002_rollups_search_trending
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_query_shaped_indexes"
+down_revision = "0002_rollups_search_trending"
+branch_labels = None
+depends_on = None
+
+REDUNDANT = [
+    ("users", "id"),
+    ("users", "phone_number"),
+    ("users", "joined_at"),
+    ("lessons", "id"),
+    ("lessons", "title"),
+    ("lessons", "is_published"),
+    ("lessons", "created_at"),
+    ("test_questions", "id"),
+    ("user_test_results", "id"),
+    ("user_test_results", "user_id"),
+    ("user_test_results", "lesson_id"),
+    ("user_test_results", "started_at"),
+    ("user_lesson_access", "id"),
+    ("user_lesson_access", "user_id"),
+    ("user_lesson_access", "is_unlocked"),
+    ("user_lesson_access", "unlocked_at"),
+    ("categories", "id"),
+    ("articles", "id"),
+]
+
+
+def upgrade():
+    op.create_index(
+        "ix_lessons_published_created_at", "lessons", ["created_at", "id"],
+        postgresql_where=sa.text("is_published")
+    )
+    op.create_index("ix_user_test_results_lesson_ended_at", "user_test_results", ["lesson_id", "ended_at"])
+    op.create_index("ix_user_lesson_access_user_lesson", "user_lesson_access", ["user_id", "lesson_id"])
+    op.create_index("ix_user_lesson_access_paid_at", "user_lesson_access", ["paid_at"])
+    op.create_index("ix_articles_category_id", "articles", ["category_id"])
+
+    for table, column in REDUNDANT:
+        op.drop_index(f"ix_{table}_{column}", table_name=table)
+
+
+def downgrade():
+    for table, column in REDUNDANT:
+        op.create_index(f"ix_{table}_{column}", table, [column])
+
+    op.drop_index("ix_articles_category_id", table_name="articles")
+    op.drop_index("ix_user_lesson_access_paid_at", table_name="user_lesson_access")
+    op.drop_index("ix_user_lesson_access_user_lesson", table_name="user_lesson_access")
+    op.drop_index("ix_user_test_results_lesson_ended_at", table_name="user_test_results")
+    op.drop_index("ix_lessons_published_created_at", table_name="lessons")
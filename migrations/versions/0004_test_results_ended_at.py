@@ -0,0 +1,20 @@
+"""Index user_test_results.ended_at for the dashboard's latest results
+
+Revision ID: 0004_test_results_ended_at
+Revises: 0003_query_shaped_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004_test_results_ended_at"
+down_revision = "0003_query_shaped_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_user_test_results_ended_at", "user_test_results", ["ended_at"])
+
+
+def downgrade():
+    op.drop_index("ix_user_test_results_ended_at", table_name="user_test_results")
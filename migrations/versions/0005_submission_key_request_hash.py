@@ -0,0 +1,21 @@
+"""Store a fingerprint of the answers with each submission idempotency key
+
+Revision ID: 0005_submission_key_request_hash
+Revises: 0004_test_results_ended_at
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_submission_key_request_hash"
+down_revision = "0004_test_results_ended_at"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("test_submission_keys", sa.Column("request_hash", sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column("test_submission_keys", "request_hash")
@@ -0,0 +1,38 @@
+"""Index the article listing sorts with NULLs sorted last
+
+Revision ID: 0006_article_listing_nulls_last
+Revises: 0005_submission_key_request_hash
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_article_listing_nulls_last"
+down_revision = "0005_submission_key_request_hash"
+branch_labels = None
+depends_on = None
+
+# Nullable sort columns and the value their NULLs sort as (SORT_NULLS)
+SORT_COLUMNS = (
+    ("latest", "published_at", "'-infinity'::timestamp"),
+    ("popular", "view_count", "-1"),
+    ("important", "importance_score", "'-Infinity'::float8"),
+)
+
+
+def upgrade():
+    for name, column, null in SORT_COLUMNS:
+        op.drop_index(f"ix_articles_published_{name}", table_name="articles")
+        op.create_index(
+            f"ix_articles_published_{name}", "articles", [sa.text(f"coalesce({column}, {null})"), "id"],
+            postgresql_where=sa.text("is_published")
+        )
+
+
+def downgrade():
+    for name, column, null in SORT_COLUMNS:
+        op.drop_index(f"ix_articles_published_{name}", table_name="articles")
+        op.create_index(
+            f"ix_articles_published_{name}", "articles", [column, "id"],
+            postgresql_where=sa.text("is_published")
+        )
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Recompute article trending scores from the hourly view buckets.
+
+Trending scores are maintained incrementally as views are flushed, so this
+is only needed after changing TRENDING_HALF_LIFE_HOURS. Views older than
+TRENDING_BUCKET_RETENTION_DAYS are no longer in the buckets and are left out.
+"""
+from app.core.config import settings
+from app.core.database import SessionLocal, init_db
+from app.services import trending
+
+
+def rebuild_trending():
+    """Recompute all trending scores"""
+    init_db()
+    db = SessionLocal()
+
+    try:
+        updated = trending.rebuild(db)
+        print(f"✅ Trending scores rebuilt for {updated} articles "
+              f"(half-life {settings.TRENDING_HALF_LIFE_HOURS}h)")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🚀 Rebuilding trending scores...")
+    rebuild_trending()
+    print("🎉 Done!")
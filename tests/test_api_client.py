@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from bot.config import bot_config
+from bot.services.api_client import APIClient, is_stale
+
+
+@pytest.fixture(autouse=True)
+def fast_client(monkeypatch):
+    monkeypatch.setattr(bot_config, "API_TIMEOUT_TOTAL", 0.2)
+    monkeypatch.setattr(bot_config, "API_RETRY_ATTEMPTS", 2)
+    monkeypatch.setattr(bot_config, "API_RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(bot_config, "API_BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(bot_config, "API_STATS_LOG_INTERVAL", 0)
+
+
+async def serve(handler):
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+def slow_body(status):
+    """Sends the status line and headers at once, the body never"""
+    async def handler(request):
+        response = web.StreamResponse(status=status, headers={"Content-Type": "application/json"})
+        response.content_length = 100
+        await response.prepare(request)
+        await asyncio.sleep(1)
+        return response
+    return handler
+
+
+def broken_body(status):
+    """Sends part of the body and drops the connection"""
+    async def handler(request):
+        response = web.StreamResponse(status=status, headers={"Content-Type": "application/json"})
+        response.content_length = 100
+        await response.prepare(request)
+        await response.write(b'{"partial": ')
+        request.transport.close()
+        return response
+    return handler
+
+
+@pytest.mark.parametrize("handler", [slow_body(200), slow_body(503), broken_body(200), broken_body(503)])
+def test_failed_body_read_is_a_failed_request(handler):
+    async def run():
+        runner, base_url = await serve(handler)
+        api = APIClient(base_url)
+        try:
+            result = await api._request("GET", "/bot/user/1/lessons")
+            return result, api.breaker.stats(), api.metrics.snapshot()
+        finally:
+            await api.close()
+            await runner.cleanup()
+
+    result, breaker, metrics = asyncio.run(run())
+    assert result is None
+    # Both attempts failed and count against the circuit
+    assert breaker["consecutive_failures"] == 2
+    outcomes = metrics["GET /bot/user/{id}/lessons"]["outcomes"]
+    assert sum(outcomes.values()) == 2
+    assert set(outcomes) <= {"timeout", "connection_error"}
+
+
+def test_open_circuit_serves_stale_responses():
+    state = {"down": False, "hits": 0}
+
+    async def handler(request):
+        state["hits"] += 1
+        if state["down"]:
+            return web.Response(status=503, text="down")
+        return web.json_response([{"title": "Lesson"}])
+
+    async def run():
+        runner, base_url = await serve(handler)
+        api = APIClient(base_url)
+        try:
+            fresh = await api.get_user_lessons(1)
+            api.responses.ttl = 0
+            api.responses.put(1, "lessons", fresh)  # expired at once
+            state["down"] = True
+            stale = await api.get_user_lessons(1)
+            unknown = await api.get_user_lessons(2)
+            hits = state["hits"]
+            rejected = await api.get_user_lessons(1)
+            return fresh, stale, unknown, rejected, hits, state["hits"], api.breaker.state
+        finally:
+            await api.close()
+            await runner.cleanup()
+
+    fresh, stale, unknown, rejected, hits, final_hits, breaker_state = asyncio.run(run())
+    assert not is_stale(fresh)
+    assert is_stale(stale) and stale == fresh
+    assert unknown is None
+    assert breaker_state == "open"
+    # While the circuit is open, requests are not sent
+    assert is_stale(rejected) and final_hits == hits
+
+
+def test_only_not_found_means_unregistered():
+    # Telegram ID -> status of /bot/user/{id}/exists
+    statuses = {1: 200, 2: 404, 3: 500, 4: 400}
+    hits = []
+
+    async def handler(request):
+        telegram_id = int(request.match_info["tail"].split("/")[2])
+        hits.append(telegram_id)
+        status = statuses[telegram_id]
+        if status == 200:
+            return web.json_response({"exists": True})
+        return web.json_response({"detail": "error"}, status=status)
+
+    async def run():
+        runner, base_url = await serve(handler)
+        api = APIClient(base_url)
+        try:
+            first = {tid: await api.check_user_exists(tid) for tid in statuses}
+            second = {tid: await api.check_user_exists(tid) for tid in statuses}
+            return first, second, api.registered_users.stats()
+        finally:
+            await api.close()
+            await runner.cleanup()
+
+    first, second, cached = asyncio.run(run())
+    assert first == second == {1: True, 2: False, 3: True, 4: True}
+    # Only the confirmed registration is cached; the rest ask again
+    assert cached["entries"] == 1
+    assert hits.count(1) == 1
+    assert hits.count(2) == hits.count(3) == hits.count(4) == 2
+
+
+def test_open_circuit_does_not_ask_users_to_register():
+    hits = []
+
+    async def handler(request):
+        hits.append(request.path)
+        return web.Response(status=503, text="down")
+
+    async def run():
+        runner, base_url = await serve(handler)
+        api = APIClient(base_url)
+        try:
+            while api.breaker.state != "open":
+                await api.get_user_lessons(1)
+            sent = len(hits)
+            registered = await api.check_user_exists(2)
+            return registered, sent, api.registered_users.stats()
+        finally:
+            await api.close()
+            await runner.cleanup()
+
+    registered, sent, cached = asyncio.run(run())
+    assert registered is True
+    assert len(hits) == sent
+    assert cached["entries"] == 0
@@ -0,0 +1,79 @@
+import time
+from datetime import datetime, timedelta
+
+from app.api import articles
+from app.models.article import ArticleDB, CategoryDB
+
+
+def test_article_validators_renew_with_view_counts(client, db, monkeypatch):
+    category = CategoryDB(name="ETags", slug="etags")
+    db.add(category)
+    db.flush()
+    db.add(ArticleDB(title="ETag", slug="etag-article", content="c", category_id=category.id, is_published=True, view_count=0))
+    db.commit()
+
+    now = time.time()
+    monkeypatch.setattr(articles.time, "time", lambda: now)
+    first = client.get("/v1/articles/etag-article")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    revalidated = client.get("/v1/articles/etag-article", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    listing = client.get("/v1/articles", params={"category": "etags"})
+    assert client.get(
+        "/v1/articles", params={"category": "etags"}, headers={"If-None-Match": listing.headers["etag"]}
+    ).status_code == 304
+
+    # A view flush changes view_count but not updated_at; the next max-age
+    # window gets new validators
+    now += articles.settings.HTTP_CACHE_MAX_AGE
+    renewed = client.get("/v1/articles/etag-article", headers={"If-None-Match": etag})
+    assert renewed.status_code == 200
+    assert renewed.headers["etag"] != etag
+    assert renewed.json()["view_count"] == 3
+    assert client.get(
+        "/v1/articles/etag-article", headers={"If-Modified-Since": first.headers["last-modified"]}
+    ).status_code == 200
+    assert client.get(
+        "/v1/articles", params={"category": "etags"}, headers={"If-None-Match": listing.headers["etag"]}
+    ).status_code == 200
+
+
+def test_cursor_pages_across_null_published_at(client, db):
+    category = CategoryDB(name="Cursors", slug="cursors")
+    db.add(category)
+    db.flush()
+    day = datetime(2026, 1, 1)
+    published = [day, day, day - timedelta(days=1), None, None]
+    db.add_all([
+        ArticleDB(
+            title=f"Cursor {i}", slug=f"cursor-{i}", content="c", category_id=category.id,
+            is_published=True, published_at=published_at
+        )
+        for i, published_at in enumerate(published)
+    ])
+    db.commit()
+
+    slugs, cursor = [], None
+    while True:
+        params = {"category": "cursors", "sort": "latest", "limit": 2, "with_total": False}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/v1/articles", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        slugs += [article["slug"] for article in body["data"]]
+        cursor = body["meta"]["next_cursor"]
+        if not cursor:
+            break
+
+    by_slug = {article.slug: article for article in db.query(ArticleDB).filter(ArticleDB.category_id == category.id)}
+    expected = sorted(
+        by_slug,
+        key=lambda slug: (by_slug[slug].published_at is not None, by_slug[slug].published_at or day, str(by_slug[slug].id)),
+        reverse=True
+    )
+    # Every article once, undated ones last
+    assert slugs == expected
+    assert [by_slug[slug].published_at for slug in slugs[-2:]] == [None, None]
@@ -0,0 +1,61 @@
+import re
+from datetime import datetime
+
+from app.core.query_stats import assert_max_queries
+from app.models.access import UserLessonAccessDB
+from app.models.lesson import LessonDB
+from app.models.test_result import UserTestResultDB
+from app.models.user import UserDB
+from app.services.cache import shared_cache
+from app.services.user_cache import user_cache
+
+TELEGRAM_ID = 700001
+
+# User lookup, lesson catalog, the user's purchases and results
+LESSONS_QUERIES = 3
+
+
+def add_lessons(db, user, count):
+    for i in range(count):
+        lesson = LessonDB(
+            title=f"Lesson {i}", description="d", video_url="v", pdf_url="p", ppt_url="p", is_published=True
+        )
+        db.add(lesson)
+        db.flush()
+        db.add(UserLessonAccessDB(user_id=user.id, lesson_id=lesson.id, amount=50000))
+        db.add(UserTestResultDB(
+            user_id=user.id, lesson_id=lesson.id, score=80, total_questions=5, answers=[], ended_at=datetime.utcnow()
+        ))
+    db.commit()
+
+
+def lessons_query_count(client):
+    """Statements run by a cold /lessons request (no cached user or catalog)"""
+    user_cache.invalidate(TELEGRAM_ID)
+    client.portal.call(shared_cache.invalidate, "lessons", "catalog")
+    with assert_max_queries(LESSONS_QUERIES):
+        response = client.get(f"/bot/user/{TELEGRAM_ID}/lessons")
+    assert response.status_code == 200
+    count = int(re.search(r'desc="(\d+) quer', response.headers["server-timing"]).group(1))
+    return count, response.json()
+
+
+def test_lessons_query_count_does_not_grow_with_lessons(client, db):
+    user = UserDB(full_name="Query Count", telegram_id=TELEGRAM_ID, phone_number="+998900000001")
+    db.add(user)
+    db.commit()
+
+    add_lessons(db, user, 1)
+    one_lesson, lessons = lessons_query_count(client)
+    assert len(lessons) == 1
+
+    add_lessons(db, user, 24)
+    many_lessons, lessons = lessons_query_count(client)
+    assert len(lessons) == 25
+    assert all(lesson["has_access"] and lesson["score"] == 80 for lesson in lessons)
+
+    assert many_lessons == one_lesson
+
+
+def test_lessons_unknown_user(client):
+    assert client.get("/bot/user/1/lessons").status_code == 404
@@ -0,0 +1,18 @@
+from app.models.user import UserDB
+
+TELEGRAM_ID = 720001
+
+
+def test_user_exists(client, db):
+    db.add(UserDB(full_name="Exists", telegram_id=TELEGRAM_ID, phone_number="+998900000021"))
+    db.commit()
+
+    response = client.get(f"/bot/user/{TELEGRAM_ID}/exists")
+    assert response.status_code == 200
+    assert response.json() == {"exists": True}
+    assert client.head(f"/bot/user/{TELEGRAM_ID}/exists").status_code == 200
+
+
+def test_unknown_user_does_not_exist(client):
+    assert client.get(f"/bot/user/{TELEGRAM_ID + 1}/exists").status_code == 404
+    assert client.head(f"/bot/user/{TELEGRAM_ID + 1}/exists").status_code == 404
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+from bot.utils import cache, circuit_breaker
+from bot.utils.cache import TTLCache, UserResponseCache
+from bot.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from bot.utils.singleflight import SingleFlight
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    async def run():
+        flight = SingleFlight()
+        upstream = 0
+
+        async def fetch():
+            nonlocal upstream
+            upstream += 1
+            await asyncio.sleep(0.01)
+            return {"n": upstream}
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(10)))
+        again = await flight.do("key", fetch)
+        return flight, upstream, results, again
+
+    flight, upstream, results, again = asyncio.run(run())
+    assert upstream == 2
+    assert results == [{"n": 1}] * 10
+    assert again == {"n": 2}
+    assert flight.stats()["coalesced"] == 9
+    assert flight.stats()["inflight"] == 0
+
+
+def test_singleflight_shares_exceptions():
+    async def run():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_singleflight_keys_are_independent():
+    async def run():
+        flight = SingleFlight()
+
+        async def value(v):
+            await asyncio.sleep(0.01)
+            return v
+
+        results = await asyncio.gather(flight.do("a", lambda: value(1)), flight.do("b", lambda: value(2)))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert results == [1, 2]
+    assert flight.stats()["upstream"] == 2
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=10)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_success()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_half_open_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=10, half_open_max_calls=1)
+    breaker.record_failure()
+    clock.now += 9
+    assert not breaker.allow()
+
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_breaker_release_frees_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_ttl_cache_expiry_and_eviction(clock):
+    ttl_cache = TTLCache(max_size=2, ttl=60)
+    ttl_cache.put("a", 1)
+    ttl_cache.put("b", 2)
+    assert ttl_cache.get("a") == 1
+    ttl_cache.put("c", 3)  # evicts "b", the least recently used
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("c") == 3
+
+    clock.now += 61
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.stats()["evictions"] == 1
+
+
+def test_user_response_cache(clock):
+    responses = UserResponseCache(max_entries=3, ttl=60)
+    responses.put(1, "lessons", [1])
+    responses.put(1, "stats", {"s": 1})
+    responses.put(2, "lessons", [2])
+    assert responses.get(1, "lessons") == [1]
+
+    responses.put(3, "lessons", [3])  # over the limit: user 2 is the least recently used
+    assert responses.get(2, "lessons") is None
+    assert responses.stats()["entries"] == 3
+
+    responses.invalidate_user(1)
+    assert responses.get(1, "lessons") is None
+    assert responses.get_stale(1, "lessons") is None
+
+
+def test_user_response_cache_serves_stale_entries(clock):
+    responses = UserResponseCache(max_entries=10, ttl=60)
+    responses.put(1, "lessons", [1])
+    clock.now += 61
+    assert responses.get(1, "lessons") is None
+    assert responses.get_stale(1, "lessons") == [1]
+    assert responses.get_stale(1, "results") is None
+    assert responses.stats()["stale_hits"] == 1
+
+
+def test_singleflight_cancelled_caller_does_not_cancel_waiters():
+    async def run():
+        flight = SingleFlight()
+        upstream = 0
+
+        async def fetch():
+            nonlocal upstream
+            upstream += 1
+            await asyncio.sleep(0.05)
+            return upstream
+
+        leader = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flight.do("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        return flight, leader, results, upstream
+
+    flight, leader, results, upstream = asyncio.run(run())
+    assert leader.cancelled()
+    assert results == [2, 2, 2]
+    assert upstream == 2
+    assert flight.stats()["inflight"] == 0
@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.http_cache import is_not_modified, weak_etag
+from app.utils.pagination import decode_cursor, encode_cursor, parse_cursor_datetime, parse_cursor_uuid
+
+
+def request_with(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_cursor_round_trip():
+    published_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    article_id = uuid.uuid4()
+    cursor = encode_cursor([published_at, 42, str(article_id)])
+    assert "=" not in cursor
+
+    values = decode_cursor(cursor, 3)
+    assert parse_cursor_datetime(values[0]) == published_at
+    assert values[1] == 42
+    assert parse_cursor_uuid(values[2]) == article_id
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor([1, 2]), "eyJhIjoxfQ"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 3)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("value, parse", [("yesterday", parse_cursor_datetime), (5, parse_cursor_uuid)])
+def test_invalid_cursor_values(value, parse):
+    with pytest.raises(HTTPException):
+        parse(value)
+
+
+def test_if_none_match():
+    etag = weak_etag("article", 1)
+    assert etag.startswith('W/"')
+    assert is_not_modified(request_with(if_none_match=etag), etag)
+    assert is_not_modified(request_with(if_none_match=etag.removeprefix("W/")), etag)
+    assert is_not_modified(request_with(if_none_match=f'"other", {etag}'), etag)
+    assert is_not_modified(request_with(if_none_match="*"), etag)
+    assert not is_not_modified(request_with(if_none_match='W/"other"'), etag)
+    assert not is_not_modified(request_with(), etag)
+
+
+def test_if_modified_since():
+    modified = datetime(2024, 5, 1, 12, 0, 0, 500000)
+    assert is_not_modified(request_with(if_modified_since="Wed, 01 May 2024 12:00:00 GMT"), "x", modified)
+    assert not is_not_modified(request_with(if_modified_since="Wed, 01 May 2024 11:59:59 GMT"), "x", modified)
+    assert not is_not_modified(request_with(if_modified_since="garbage"), "x", modified)
+    aware = modified.replace(tzinfo=timezone.utc)
+    assert is_not_modified(request_with(if_modified_since="Wed, 01 May 2024 12:00:00 GMT"), "x", aware)
+
+
+def test_if_none_match_takes_precedence():
+    modified = datetime(2024, 5, 1, 12, 0, 0)
+    request = request_with(if_none_match='W/"other"', if_modified_since="Wed, 01 May 2024 12:00:00 GMT")
+    assert not is_not_modified(request, weak_etag("x"), modified)
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from app.models.access import UserLessonAccessDB
+from app.models.lesson import LessonDB
+from app.models.rollup import DailyLessonStatsDB
+from app.models.test_question import TestQuestionDB as QuestionDB
+from app.models.test_result import TestSubmissionKeyDB as SubmissionKeyDB, UserTestResultDB
+from app.models.user import UserDB
+
+TELEGRAM_ID = 730001
+
+
+def test_submissions_with_an_idempotency_key(client, db):
+    user = UserDB(full_name="Idempotent", telegram_id=TELEGRAM_ID, phone_number="+998900000017")
+    lessons = [
+        LessonDB(title=f"Idempotent {i}", description="d", video_url="v", pdf_url="p", ppt_url="p", is_published=True)
+        for i in range(2)
+    ]
+    db.add_all([user] + lessons)
+    db.flush()
+    questions = [QuestionDB(lesson_id=lessons[0].id, question_text=f"Q{i}", options=["a", "b"], correct_option=0) for i in range(2)]
+    db.add_all(questions)
+    db.add_all([UserLessonAccessDB(user_id=user.id, lesson_id=lesson.id, amount=1000) for lesson in lessons])
+    db.commit()
+
+    def submit(key, selected_option=0, lesson=lessons[0]):
+        return client.post(
+            f"/bot/user/{TELEGRAM_ID}/lesson/{lesson.id}/test",
+            json={"answers": [{"question_id": str(q.id), "selected_option": selected_option} for q in questions]},
+            headers={"Idempotency-Key": key}
+        )
+
+    def saved_results():
+        db.expire_all()
+        return db.execute(
+            select(UserTestResultDB.id, UserTestResultDB.score, UserTestResultDB.ended_at)
+            .where(UserTestResultDB.user_id == user.id)
+        ).all()
+
+    def completions():
+        return db.scalar(
+            select(func.coalesce(func.sum(DailyLessonStatsDB.test_completions), 0))
+            .where(DailyLessonStatsDB.lesson_id == lessons[0].id)
+        )
+
+    # First claim grades and saves the attempt
+    first = submit("attempt-1")
+    assert first.status_code == 200
+    assert first.json()["score"] == 100
+    results = saved_results()
+    assert len(results) == 1
+    assert completions() == 1
+
+    # A replay returns the saved response and leaves the result alone
+    replay = submit("attempt-1")
+    assert replay.status_code == 200
+    assert replay.json() == first.json()
+    assert saved_results() == results
+    assert completions() == 1
+
+    # Same key, different request
+    assert submit("attempt-1", selected_option=1).status_code == 422
+    assert submit("attempt-1", lesson=lessons[1]).status_code == 422
+
+    # A claimed key without a response belongs to a request still in flight
+    db.add(SubmissionKeyDB(user_id=user.id, key="attempt-2", lesson_id=lessons[0].id, created_at=datetime.utcnow()))
+    db.commit()
+    assert submit("attempt-2").status_code == 409
+    assert saved_results() == results
+
+    # An expired key is claimed again and the attempt is graded
+    db.execute(
+        update(SubmissionKeyDB)
+        .where(SubmissionKeyDB.user_id == user.id, SubmissionKeyDB.key == "attempt-1")
+        .values(created_at=datetime.utcnow() - timedelta(days=2))
+    )
+    db.commit()
+    retaken = submit("attempt-1", selected_option=1)
+    assert retaken.status_code == 200
+    assert retaken.json()["score"] == 0
+    assert retaken.json()["result_id"] == first.json()["result_id"]
+    assert [row.score for row in saved_results()] == [0]
+    assert completions() == 1
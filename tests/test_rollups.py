@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models.lesson import LessonDB
+from app.models.rollup import DailyLessonStatsDB
+from app.models.test_question import TestQuestionDB as QuestionDB
+from app.models.test_result import UserTestResultDB
+from app.models.user import UserDB
+from app.services import rollups
+
+
+def lesson_rollups(db, lesson_ids):
+    db.expire_all()
+    rows = db.execute(
+        select(DailyLessonStatsDB.day, DailyLessonStatsDB.lesson_id, DailyLessonStatsDB.test_completions)
+        .where(DailyLessonStatsDB.lesson_id.in_(lesson_ids), DailyLessonStatsDB.test_completions != 0)
+    ).all()
+    return sorted((row.day, str(row.lesson_id), row.test_completions) for row in rows)
+
+
+def test_test_completions_follow_saved_results(client, db, admin_headers):
+    lessons = [
+        LessonDB(title=f"Rollup {i}", description="d", video_url="v", pdf_url="p", ppt_url="p", is_published=True)
+        for i in range(2)
+    ]
+    users = [UserDB(full_name=f"Rollup {i}", telegram_id=710000 + i, phone_number=f"+99891000000{i}") for i in range(2)]
+    db.add_all(lessons + users)
+    db.flush()
+    questions = [QuestionDB(lesson_id=lesson.id, question_text="Q", options=["a", "b"], correct_option=0) for lesson in lessons]
+    db.add_all(questions)
+    db.commit()
+    for user in users:
+        for lesson in lessons:
+            assert client.post(
+                "/admin/access/grant",
+                json={"user_id": str(user.id), "lesson_id": str(lesson.id), "amount": 1000},
+                headers=admin_headers
+            ).status_code == 200
+
+    # An earlier result, completed two days ago
+    two_days_ago = datetime.utcnow() - timedelta(days=2)
+    db.add(UserTestResultDB(
+        user_id=users[0].id, lesson_id=lessons[0].id, score=0, total_questions=1, answers=[], ended_at=two_days_ago
+    ))
+    for stmt in rollups.test_completion(lessons[0].id, two_days_ago):
+        db.execute(stmt)
+    db.commit()
+
+    def submit(user, question):
+        response = client.post(
+            f"/bot/user/{user.telegram_id}/lesson/{question.lesson_id}/test",
+            json={"answers": [{"question_id": str(question.id), "selected_option": 0}]}
+        )
+        assert response.status_code == 200
+
+    submit(users[0], questions[0])  # re-take: moves the count to today
+    submit(users[0], questions[0])  # again today: no change
+    submit(users[0], questions[1])
+    submit(users[1], questions[0])
+
+    lesson_ids = [lesson.id for lesson in lessons]
+    today = datetime.utcnow().date()
+    live = lesson_rollups(db, lesson_ids)
+    assert live == sorted([(today, str(lessons[0].id), 2), (today, str(lessons[1].id), 1)])
+
+    assert client.delete(f"/admin/users/{users[1].id}", headers=admin_headers).status_code == 200
+    live = lesson_rollups(db, lesson_ids)
+    assert live == sorted([(today, str(lessons[0].id), 1), (today, str(lessons[1].id), 1)])
+
+    rollups.backfill(db)
+    assert lesson_rollups(db, lesson_ids) == live
+
+    dashboard = client.get("/admin/dashboard", headers=admin_headers).json()
+    assert dashboard["test_completions_this_month"] >= 2
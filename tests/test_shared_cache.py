@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from app.services.cache import MemoryBackend, RedisBackend, SharedCache
+
+
+def memory_cache():
+    return SharedCache(MemoryBackend())
+
+
+def fakeredis_cache():
+    fakeredis = pytest.importorskip("fakeredis.aioredis")
+    return SharedCache(RedisBackend(fakeredis.FakeRedis()))
+
+
+@pytest.fixture(params=[memory_cache, fakeredis_cache], ids=["memory", "fakeredis"])
+def make_cache(request):
+    return request.param
+
+
+def test_get_or_load_caches_and_coalesces(make_cache):
+    async def run():
+        cache = make_cache()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"calls": calls}
+
+        values = await asyncio.gather(*(cache.get_or_load("ns", "k", loader, ttl=60) for _ in range(5)))
+        cached = await cache.get_or_load("ns", "k", loader, ttl=60)
+        return cache, values, cached, calls
+
+    cache, values, cached, calls = asyncio.run(run())
+    assert calls == 1
+    assert values == [{"calls": 1}] * 5
+    assert cached == {"calls": 1}
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_invalidation_during_load_is_not_overwritten(make_cache):
+    async def run():
+        cache = make_cache()
+        catalog = ["old"]
+        loading = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_loader():
+            value = list(catalog)  # reads the data before the admin commit
+            loading.set()
+            await release.wait()
+            return value
+
+        stale_load = asyncio.create_task(cache.get_or_load("lessons", "catalog", slow_loader, ttl=60))
+        await loading.wait()
+
+        catalog.append("new")
+        await cache.invalidate("lessons", "catalog")
+        # Callers after the invalidation do not join the stale load
+        fresh = await cache.get_or_load("lessons", "catalog", lambda: asyncio.sleep(0, list(catalog)), ttl=60)
+
+        release.set()
+        stale = await stale_load
+        cached = await cache.get("lessons", "catalog")
+        return cache, stale, fresh, cached
+
+    cache, stale, fresh, cached = asyncio.run(run())
+    assert stale == ["old"]
+    assert fresh == ["old", "new"]
+    assert cached == ["old", "new"]
+    assert cache.stats()["stale_loads"] == 1
+
+
+def test_invalidate_notifies_listeners():
+    async def run():
+        cache = memory_cache()
+        seen = []
+        cache.on_invalidate("users", seen.append)
+        await cache.set("users", 5, {"id": 5}, ttl=60)
+        await cache.invalidate("users", 5)
+        return seen, await cache.get("users", 5)
+
+    seen, value = asyncio.run(run())
+    assert seen == ["5"]
+    assert value is None
+
+
+def test_cancelled_load_is_taken_over_by_a_waiter():
+    async def run():
+        cache = memory_cache()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        leader = asyncio.create_task(cache.get_or_load("ns", "k", loader, ttl=60))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_load("ns", "k", loader, ttl=60)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        return leader, results, calls
+
+    leader, results, calls = asyncio.run(run())
+    assert leader.cancelled()
+    assert results == [2, 2, 2]
+    assert calls == 2
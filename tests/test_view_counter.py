@@ -0,0 +1,40 @@
+import random
+
+from sqlalchemy import select
+
+from app.models.article import ArticleDB, ArticleViewBucketDB, CategoryDB
+from app.services.view_counter import ViewCounter
+
+
+def test_flush_writes_batched_views(client, db):
+    category = CategoryDB(name="Views", slug="views")
+    db.add(category)
+    db.flush()
+    articles = [
+        ArticleDB(title=f"Views {i}", slug=f"views-{i}", content="c", category_id=category.id, is_published=True, view_count=5)
+        for i in range(20)
+    ]
+    db.add_all(articles)
+    db.commit()
+    updated_at = {article.id: article.updated_at for article in articles}
+
+    counter = ViewCounter()
+    expected = {}
+    for article in random.sample(articles, len(articles)):
+        views = random.randint(1, 5)
+        expected[article.id] = views
+        for _ in range(views):
+            counter.record(article.id)
+
+    assert client.portal.call(counter.flush) == sum(expected.values())
+    assert counter.stats()["pending_views"] == 0
+
+    db.expire_all()
+    rows = db.execute(select(ArticleDB.id, ArticleDB.view_count, ArticleDB.updated_at).where(ArticleDB.id.in_(expected))).all()
+    assert {row.id: row.view_count for row in rows} == {article_id: 5 + views for article_id, views in expected.items()}
+    assert {row.id: row.updated_at for row in rows} == updated_at
+
+    buckets = db.execute(
+        select(ArticleViewBucketDB.article_id, ArticleViewBucketDB.views).where(ArticleViewBucketDB.article_id.in_(expected))
+    ).all()
+    assert dict(buckets) == expected